@@ -0,0 +1 @@
+"""Genetic algorithms, exact solvers and the tools around their runs."""
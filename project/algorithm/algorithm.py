@@ -1,9 +1,267 @@
-import csv
+import heapq
+import math
+import os
+import random
+import time
 import numpy as np
+from collections import Counter
 from copy import deepcopy
-from base.individuals import *
-import matplotlib.pyplot as plt
-from algorithm.utils import * 
+from itertools import count
+from base.individuals import calculate_route_gain, delta_route_gain, no_constraint, no_constraint_batch, repair_constraints_batch
+from base.problem import operator_problem, problem_rules, gain_values
+from base.population import calculate_population_gain_batch, routes_from_ranks
+from algorithm.utils import get_n_elites, population_diversity
+from algorithm.log import GenerationLog
+from algorithm.history import new_history, record_generation, history_arrays, plot_history
+from algorithm.profiling import untimed
+from operators.crossovers import BATCH_CROSSOVERS
+from operators.mutators import BATCH_MUTATORS, DELTA_MUTATORS
+from operators.selectors import SAMPLERS, selection_function
+
+__all__ = ['create_offspring_array', 'create_offspring_batch', 'ga', 'stop_criterion', 'island_ga', 'breed_children',
+           'steady_state_ga', 'held_karp', 'solve', 'brute_force']
+
+
+def breed_children(population, pop_fit, selector, crossover, mutator, p_xo, p_m, n_children, repair=False, problem=None,
+                   delta_eval=False, gain_matrix=None, profiler=None):
+    """
+    Breeds valid children from a population, the breeding step of ga, create_offspring_array and
+    steady_state_ga: two different parents are selected, crossed with probability p_xo (copied otherwise)
+    and mutated with probability p_m, and the children are kept if they satisfy the constraints. Parents
+    whose children break the constraints 40 times in a row are selected again.
+
+    The sampler of the selector is built once per call (see selection_function).
+
+    Args:
+        population (list or numpy.ndarray) : collection of individuals in the population, the rows of a
+                                             matrix being bred as lists
+        pop_fit (list) : gains of the individuals
+        selector (function) : selects an individual from the population based on their gain
+        crossover (function) : performs a crossover technique on two parents to generate offspring
+        mutator (function) : performs a mutation technique on an individual
+        p_xo (float) : probability of crossover
+        p_m (float): probability of mutation
+        n_children (int) : number of children to breed
+        repair (bool) : If True, children breaking the constraints are repaired instead of bred again
+        problem (Problem) : areas, depot and constraints of the routes (the Hollow Knight rules if None)
+        delta_eval (bool) : If True, children copied from a parent and mutated get their gain from the parent's
+                            gain and the edges the mutation changed (delta_route_gain). Needs a list population
+                            and a mutator from DELTA_MUTATORS
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location, for delta_eval
+        profiler (Profiler) : if given, times the selection, crossover, mutation, constraints and repair phases,
+                              and counts the children rejected by the constraints
+
+    Returns:
+        list : the children
+        list : the gain of each child when it is known without evaluating it (delta_eval), None otherwise
+    """
+
+    operator_args = {} if problem is None else {'problem': problem}
+    array_population = isinstance(population, np.ndarray)
+
+    # With a profiler, the function of each phase is wrapped to be timed, otherwise it is left as it is
+    timed = untimed if profiler is None else profiler.timed
+    select = timed('selection', selection_function(selector, population, pop_fit))
+    cross, mutate = timed('crossover', crossover), timed('mutation', mutator)
+    check, repair_routes = timed('constraints', no_constraint), timed('repair', repair_constraints_batch)
+
+    # Gains of the parents, for the children copied from them
+    parent_fit = {id(ind): fit for ind, fit in zip(population, pop_fit)} if delta_eval else {}
+
+    children = []
+    children_fit = []
+
+    while len(children) < n_children:
+
+        # Selecting different the parents
+        p1 = select()
+        p2 = select()
+
+        counter = 0
+        while (np.array_equal(p1, p2) if array_population else p1 == p2) and counter < 10:
+            counter += 1
+            p1 = select()
+            p2 = select()
+
+        if array_population:
+            p1, p2 = p1.tolist(), p2.tolist()
+
+        max_crossover_attempts = 40
+        for attempt in range(max_crossover_attempts):
+            if random.random() < p_xo:
+                # Xover
+                o1, o2 = cross(p1, p2, **operator_args)
+                f1 = f2 = None
+                operator = crossover
+            else:
+                # Reproduction
+                o1, o2 = deepcopy(p1), deepcopy(p2)
+                f1, f2 = parent_fit.get(id(p1)), parent_fit.get(id(p2))
+                operator = None
+
+            if random.random() < p_m:
+                # Mutating the offspring
+                operator = mutator
+                if delta_eval:
+                    (o1, d1), (o2, d2) = mutate(o1, p_m, **operator_args, with_delta=True), mutate(o2, p_m, **operator_args, with_delta=True)
+                    f1 = None if f1 is None else delta_route_gain(f1, d1, o1, gain_matrix)
+                    f2 = None if f2 is None else delta_route_gain(f2, d2, o2, gain_matrix)
+                else:
+                    o1, o2 = mutate(o1, p_m, **operator_args), mutate(o2, p_m, **operator_args)
+
+            if repair and not (check(o1, problem) and check(o2, problem)):
+                o1, o2 = repair_routes(np.array([o1, o2]), problem).tolist()
+                f1 = f2 = None
+
+            if check(o1, problem) and check(o2, problem):
+                # Adding the offspring into the children
+                children.extend([o1, o2])
+                children_fit.extend([f1, f2])
+                break  # Exit the loop if valid offspring are generated
+
+            if profiler is not None:
+                profiler.reject(operator)
+
+        else:
+            # Every attempt broke the constraints, the parents are selected again
+            if profiler is not None:
+                profiler.exhaust()
+
+    # Dropping the extra child of the last pair
+    return children[:n_children], children_fit[:n_children]
+
+
+def create_offspring_array(population, pop_fit, selector, crossover, mutator, p_xo, p_m, repair=False, problem=None):
+    """
+    Builds the offspring of a population stored as a matrix, as a matrix of the population's dtype
+    (int8 up to 127 areas, int16 above, see create_population_array).
+
+    The children are bred by breed_children, with the same steps (and random draws) as the list
+    populations of ga, so both representations evolve identically.
+
+    Args:
+        population (numpy.ndarray) : current population, one individual per row
+        pop_fit (list) : gains of the current population
+        selector (function) : selects an individual from the population based on their gain
+        crossover (function) : performs a crossover technique on two parents to generate offspring
+        mutator (function) : performs a mutation technique on an individual
+        p_xo (float) : probability of crossover
+        p_m (float): probability of mutation
+        repair (bool) : if True, children breaking the constraints are repaired instead of retried
+        problem (Problem) : if given, passed to the operators and the constraint checks
+
+    Returns:
+        numpy.ndarray : offspring population with the same shape and dtype as the population
+    """
+
+    children, _ = breed_children(population, pop_fit, selector, crossover, mutator, p_xo, p_m, len(population), repair, problem)
+
+    # Writing the offspring into the offspring matrix
+    return np.array(children, dtype=population.dtype)
+
+
+def create_offspring_batch(population, pop_fit, selector, crossover_batch, mutator, p_xo, p_m, repair=False, problem=None):
+    """
+    Builds the offspring of a population stored as a matrix, crossing all the parent pairs
+    with a single call to a batch crossover (see BATCH_CROSSOVERS).
+
+    Pairs whose children break the constraints are crossed again, all together, for up to
+    40 attempts as in ga; pairs that still fail are dropped and new parents are selected.
+
+    Args:
+        population (numpy.ndarray) : current population, one individual per row
+        pop_fit (list) : gains of the current population
+        selector (function) : selects an individual from the population based on their gain
+        crossover_batch (function) : crosses an (N, 2, route length) array of parent pairs
+        mutator (function) : performs a mutation technique on an individual (its batch version
+                             from BATCH_MUTATORS is used when there is one)
+        p_xo (float) : probability of crossover
+        p_m (float): probability of mutation
+        repair (bool) : if True, children breaking the constraints are repaired instead of retried
+        problem (Problem) : if given, passed to the operators and the constraint checks
+
+    Returns:
+        numpy.ndarray : offspring population with the same shape and dtype as the population
+    """
+
+    operator_args = {} if problem is None else {'problem': problem}
+    offspring = np.empty_like(population)
+    n_children = 0
+
+    # Selectors with a sampler build it once for the whole generation
+    if selector in SAMPLERS:
+        draw = SAMPLERS[selector](pop_fit)
+
+    while n_children < len(offspring):
+
+        # Selecting different parents for every pair still needed
+        n_pairs = (len(offspring) - n_children + 1) // 2
+        parents = np.empty((n_pairs, 2, population.shape[1]), dtype=population.dtype)
+
+        if selector in SAMPLERS:
+            # Drawing all the parents at once, then drawing again the pairs of identical parents
+            parents[:] = population[draw(2 * n_pairs).reshape(n_pairs, 2)]
+
+            counter = 0
+            same = np.flatnonzero((parents[:, 0] == parents[:, 1]).all(axis=1))
+            while len(same) and counter < 10:
+                counter += 1
+                parents[same] = population[draw(2 * len(same)).reshape(-1, 2)]
+                same = same[(parents[same, 0] == parents[same, 1]).all(axis=1)]
+
+        else:
+            for pair in range(n_pairs):
+                p1 = selector(population, pop_fit)
+                p2 = selector(population, pop_fit)
+
+                counter = 0
+                while np.array_equal(p1, p2) and counter < 10:
+                    counter += 1
+                    p1 = selector(population, pop_fit)
+                    p2 = selector(population, pop_fit)
+
+                parents[pair] = p1, p2
+
+        children = np.empty_like(parents)
+        pending = np.arange(n_pairs)
+
+        max_crossover_attempts = 40
+        for attempt in range(max_crossover_attempts):
+
+            # Xover, or reproduction for the pairs that are not crossed
+            attempt_children = parents[pending]
+            xover = np.random.random(len(pending)) < p_xo
+            attempt_children[xover] = crossover_batch(attempt_children[xover], **operator_args)
+
+            # Mutating the offspring, in one call when the mutator has a batch version
+            mutating = np.random.random(len(pending)) < p_m
+            if mutator in BATCH_MUTATORS:
+                mutated_children = attempt_children[mutating]
+                BATCH_MUTATORS[mutator](mutated_children.reshape(-1, population.shape[1]), p_m, **operator_args)
+                attempt_children[mutating] = mutated_children
+            else:
+                for pair in np.flatnonzero(mutating):
+                    attempt_children[pair, 0] = mutator(attempt_children[pair, 0].tolist(), p_m, **operator_args)
+                    attempt_children[pair, 1] = mutator(attempt_children[pair, 1].tolist(), p_m, **operator_args)
+
+            if repair:
+                repair_constraints_batch(attempt_children.reshape(-1, population.shape[1]), problem)
+
+            valid = no_constraint_batch(attempt_children.reshape(-1, population.shape[1]), problem).reshape(-1, 2).all(axis=1)
+            children[pending[valid]] = attempt_children[valid]
+            pending = pending[~valid]
+
+            if not len(pending):
+                break
+
+        # Adding the valid offspring, dropping the extra child if full
+        accepted = np.ones(n_pairs, dtype=bool)
+        accepted[pending] = False
+        accepted_children = children[accepted].reshape(-1, population.shape[1])[:len(offspring) - n_children]
+        offspring[n_children:n_children + len(accepted_children)] = accepted_children
+        n_children += len(accepted_children)
+
+    return offspring
 
 
 def ga(initializer,
@@ -13,13 +271,28 @@ def ga(initializer,
        crossover,
        mutator,
        pop_size, n_gens, p_xo, p_m, elite_func, verbose=False, maximization=True,
-       log_path=None, elitism=True, seed=0, fit_plot=True):
+       log_path=None, elitism=True, seed=0, fit_plot=True, repair=False, delta_eval=False,
+       initial_population=None, return_population=False,
+       patience=None, target_fit=None, time_budget=None, min_diversity=None, return_report=False, profiler=None):
     """
     Implements a genetic algorithm to provide an optimized route
 
+    Populations stored as matrices (create_population_array) are an option for large populations:
+    every batch call has a fixed NumPy cost, which small populations do not make up for. With the
+    configuration of main.py (see benchmark.py), a run on 10 areas takes 96 ms as a matrix against
+    25 ms as a list at pop 50, 125 against 59 ms at pop 150 and 196 against 160 ms at pop 500; the
+    matrix gets ahead from about pop 1000 (455 against 669 ms at pop 2000). On 40 areas it gets
+    ahead from about pop 150.
+
     Args:
-        initializer (function) : generates an initial population of individuals
-        gain_matrix (list of lists) : data matrix cointaining the gain of each location to be used 
+        initializer (function) : generates an initial population of individuals, either as a list
+                                 or as a matrix (see create_population_array). Matrices are crossed
+                                 with the batch crossovers when the crossover has one
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used.
+                                                 A Problem is also passed to the initializer and the operators,
+                                                 which then follow its areas, depot and constraints. Plain
+                                                 matrices of other than 10 areas get the default rules for their
+                                                 size (see operator_problem)
         evaluator (function) : evaluates the gain of the population of individuals
         selector (function) : selects an individual from the population based on their gain
         crossover (function) : performs a crossover technique on two parents to generate offspring
@@ -31,14 +304,42 @@ def ga(initializer,
         elite_func (function) : returns the elite individual and its fitness from the population
         verbose (bool) : If True, print the generation results into a csv file
         maximization (bool) : If True, maximize the gain function
-        log_path (str) : path to a log file to save the generation results
+        log_path (str, os.PathLike or GenerationLog) : path to a log file to save the generation results (csv, or
+                                                        compact binary columns for .npy files), written in batches by a
+                                                        GenerationLog. A log object (GenerationLog, QueueLog) can be
+                                                        given instead, to share it between runs; it is flushed, not
+                                                        closed, at the end of the run
         elitism (bool) : if True, use elitism to preserve the best individual in each generation
         seed(int) : for the random number generator
-        fit_plot (boolean) : If True, returns a line plot with the best fitnesses of the generations
+        fit_plot (boolean) : If True, shows a line plot with the best fitnesses of the generations (plot_history)
+        repair (bool) : If True, offspring breaking the constraints are repaired (repair_constraints_batch)
+                        instead of being thrown away and crossed again
+        delta_eval (bool) : If True, offspring copied from a parent and mutated get their gain from the parent's
+                            gain and the edges the mutation changed (delta_route_gain), and only the other
+                            offspring are given to the evaluator. Needs a list population and a mutator
+                            from DELTA_MUTATORS; gains may differ from a full evaluation by rounding
+        initial_population (list or numpy.ndarray) : if given, used as the gen 0 population instead of
+                                                     calling the initializer
+        return_population (bool) : If True, the final population and its gains are returned as well
+        patience (int) : if given, stop once the best gain has not improved for this many generations
+        target_fit (float) : if given, stop once the best gain of a generation reaches it
+        time_budget (float) : if given, stop once the run has lasted this many seconds
+        min_diversity (float) : if given, stop once the share of distinct individuals in the population
+                                falls below it (see population_diversity)
+        return_report (bool) : If True, a report on the run is returned as well
+        profiler (Profiler) : if given, records the time and calls of each phase of the run, and the children
+                              rejected by the constraints. List populations are profiled phase by phase,
+                              matrices are bred in batches timed as a whole ('breeding')
 
     Returns:
-        population (list) :  final population of individuals
-        pop_fit (list) : gains of the final population of individuals
+        best_ind (list) : best individual of the final population
+        best_fit (float) : gain of the best individual
+        population (list or numpy.ndarray) : final population of individuals, if return_population
+        pop_fit (list) : gains of the final population of individuals, if return_population
+        report (dict) : if return_report, why the run stopped ('n_gens' or the stopping criterion met),
+                        the number of generations run, the run time and the history of the run: NumPy
+                        arrays of the best, mean and std gain, the diversity, the number of evaluations
+                        and the breeding and evaluation times of every generation (see record_generation)
 
     Raises:
         Exception : if the elite function is not provided
@@ -47,14 +348,43 @@ def ga(initializer,
     # Getting up the seed
     random.seed(seed)
     np.random.seed(seed)
+    start_time = time.time()
 
     if elite_func is None:
         raise Exception('Without a proper elite function, I cannot work. Humph! *grumpy sounds*')
 
+    # A problem instance drives the initializer and the operators, plain matrices get the default rules for their size
+    problem = operator_problem(gain_matrix)
+    operator_args = {} if problem is None else {'problem': problem}
+    stop_reason = None
+
+    # Generation results are kept in memory and written in batches
+    log = GenerationLog(log_path) if isinstance(log_path, (str, os.PathLike)) else log_path
+
+    # With a profiler, the function of each phase is wrapped once to be timed, otherwise it is left as it is
+    timed = untimed if profiler is None else profiler.timed
+    breed_batch, breed_array = timed('breeding', create_offspring_batch), timed('breeding', create_offspring_array)
+    evaluate, get_elite = timed('evaluation', evaluator), timed('elitism', elite_func)
+    log_row = None if log is None else timed('logging', log.log)
+
     # Initializing the gen 0 population:
-    population = initializer(pop_size)
+    if initial_population is None:
+        population = initializer(pop_size, **operator_args)
+    else:
+        population = initial_population
+    # Populations stored as matrices are bred into a preallocated matrix
+    array_population = isinstance(population, np.ndarray)
     # Evaluating the current population:
-    pop_fit = evaluator(population, gain_matrix)
+    eval_start = time.perf_counter()
+    pop_fit = evaluate(population, gain_matrix)
+
+    # Best, mean and spread of the gains, diversity, evaluations and phase times of every generation, for the report
+    history = new_history() if return_report else None
+    if history is not None:
+        record_generation(history, population, pop_fit, len(population), 0.0, time.perf_counter() - eval_start)
+
+    # Offspring gains can be updated from their parents' gains when the mutator records its edges
+    delta_eval = delta_eval and not array_population and mutator in DELTA_MUTATORS
 
     # Track the best individual and fitness values over generations
     best_individuals = []
@@ -62,57 +392,59 @@ def ga(initializer,
 
     for gen in range(n_gens):
 
-        # Creating an empty offspring population:
-        offspring = []
+        # Stopping early once a criterion is met
+        stop_reason = stop_criterion(best_fitnesses, population, start_time, patience, target_fit, time_budget, min_diversity)
+        if stop_reason is not None:
+            break
+        breed_start = time.perf_counter()
 
-        # While the offspring population is not full:
-        while len(offspring) < len(population):
+        if array_population and crossover in BATCH_CROSSOVERS:
+            offspring = breed_batch(population, pop_fit, selector, BATCH_CROSSOVERS[crossover], mutator, p_xo, p_m, repair, problem)
 
-            # Selecting different the parents
-            p1 = selector(population, pop_fit)
-            p2 = selector(population, pop_fit)
+        elif array_population:
+            offspring = breed_array(population, pop_fit, selector, crossover, mutator, p_xo, p_m, repair, problem)
 
-            counter = 0
-            while p1 == p2 and counter < 10:
-                counter += 1
-                p1 = selector(population, pop_fit)
-                p2 = selector(population, pop_fit)
-
-            max_crossover_attempts = 40
-            for attempt in range(max_crossover_attempts):
-                if random.random() < p_xo:
-                    # Xover
-                    o1, o2 = crossover(p1, p2)
-                else:
-                    # Reproduction
-                    o1, o2 = deepcopy(p1), deepcopy(p2)
-
-                if random.random() < p_m:
-                    # Mutating the offspring
-                    o1, o2 = mutator(o1, p_m), mutator(o2, p_m)
-
-                if no_constraint(o1) and no_constraint(o2):
-                    # Adding the offspring into the offspring population
-                    offspring.extend([o1, o2])
-                    break  # Exit the while loop if valid offspring are generated
-
-        # Making sure offspring population doesn't exceed pop_size
-        while len(offspring) > pop_size:  # has to be before elitism
-            offspring.pop()
+        else:
+            # Breeding the offspring population, with the gains known without evaluating them (None otherwise)
+            offspring, offspring_fit = breed_children(population, pop_fit, selector, crossover, mutator, p_xo, p_m,
+                                                      min(len(population), pop_size), repair, problem,
+                                                      delta_eval, gain_matrix, profiler)
 
         # If elitism, make sure the elite of the population is inserted into the next generation
         if elitism:
-            elite, best_fit = elite_func(population, pop_fit)
-            offspring[-1] = elite  # Adding the elite, unchanged into the offspring population
+            elite, best_fit = get_elite(population, pop_fit)
+            if array_population:
+                # Elite functions may return several elites as a matrix
+                elite = np.atleast_2d(elite)
+                offspring[-len(elite):] = elite
+            else:
+                offspring[-1] = elite  # Adding the elite, unchanged into the offspring population
+                offspring_fit[-1] = best_fit
 
         # Replacing the current population with the offspring population
         population = offspring
 
         # Evaluating the current population:
-        pop_fit = evaluator(population, gain_matrix)
+        eval_start = time.perf_counter()
+        if delta_eval:
+            # Only the offspring whose gain is not known yet
+            unknown = [i for i, fit in enumerate(offspring_fit) if fit is None]
+            for i, fit in zip(unknown, evaluate([population[i] for i in unknown], gain_matrix)):
+                offspring_fit[i] = fit
+            pop_fit = offspring_fit
+            n_evals = len(unknown)
+        else:
+            pop_fit = evaluate(population, gain_matrix)
+            n_evals = len(population)
+
+        if history is not None:
+            eval_end = time.perf_counter()
+            record_generation(history, population, pop_fit, n_evals, eval_start - breed_start, eval_end - eval_start)
 
         # Track the best individual and fitness values over generations
-        new_elite, new_fit = elite_func(population, pop_fit)
+        new_elite, new_fit = get_elite(population, pop_fit)
+        if array_population:
+            new_elite = new_elite.tolist()
         best_individuals.append(new_elite)
         best_fitnesses.append(new_fit)
 
@@ -121,23 +453,607 @@ def ga(initializer,
                 print(f'       {gen}       |        {new_fit}      ')
                 print('-' * 32)
 
-        if log_path is not None:
-            with open(log_path, 'a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([seed, gen, new_fit, new_elite])
+        if log is not None:
+            log_row(seed, gen, new_fit, new_elite)
+
+    # Logs opened by the run are closed, the ones given are only flushed
+    if log is not None and log is not log_path:
+        log.close()
+    elif log is not None:
+        log.flush()
 
     # Plot the best fitness over generations
     if fit_plot:
-        plt.plot(range(0, n_gens + 1), best_fitnesses)
-        plt.xlabel('Generation')
-        plt.xticks(range(n_gens + 1))
-        plt.ylabel('Fitness')
-        plt.title('Best Fitness Over Generations')
-        plt.show()
+        plot_history({'best': best_fitnesses})
 
     best_ind = population[np.argmax(pop_fit)]
-    best_fit = max(pop_fit)
+    # Matrix populations are evaluated with NumPy, the gain is returned as a Python float either way
+    best_fit = float(max(pop_fit))
+
+    if array_population:
+        best_ind = best_ind.tolist()
+
+    result = (best_ind, best_fit)
+
+    if return_population:
+        result += (population, pop_fit)
+
+    if return_report:
+        result += ({'stop_reason': stop_reason or 'n_gens',
+                    'n_gens': len(best_fitnesses) - 1,
+                    'run_time': time.time() - start_time,
+                    'history': history_arrays(history)},)
+
+    return result
+
+
+def stop_criterion(best_fitnesses, population, start_time, patience=None, target_fit=None, time_budget=None, min_diversity=None):
+    """
+    Checks the early stopping criteria of ga before a generation.
+
+    Args:
+        best_fitnesses (list) : best gain of every generation so far, the initial population first
+        population (list or numpy.ndarray) : current population
+        start_time (float) : time the run started at
+        patience (int) : number of generations the best gain may go without improving
+        target_fit (float) : gain to reach
+        time_budget (float) : run time allowed, in seconds
+        min_diversity (float) : lowest share of distinct individuals allowed in the population
+
+    Returns:
+        str : name of the first criterion met ('target_fit', 'patience', 'time_budget' or 'min_diversity'),
+              None if the run goes on
+    """
+
+    if target_fit is not None and best_fitnesses[-1] >= target_fit:
+        return 'target_fit'
+
+    if patience is not None and len(best_fitnesses) > patience and max(best_fitnesses[-patience:]) <= max(best_fitnesses[:-patience]):
+        return 'patience'
+
+    if time_budget is not None and time.time() - start_time >= time_budget:
+        return 'time_budget'
+
+    if min_diversity is not None and population_diversity(population) < min_diversity:
+        return 'min_diversity'
+
+    return None
+
+
+def island_epoch(args):
+    """
+    Evolves one island of island_ga between two migrations.
+
+    Args:
+        args (tuple) : (ga parameters of the island, its population (None to initialize it), seed of the epoch)
+
+    Returns:
+        tuple : (the evolved population, its gains)
+    """
+
+    params, population, seed = args
+    _, _, population, pop_fit = ga(**{**params, 'initial_population': population, 'seed': seed,
+                                      'fit_plot': False, 'return_population': True, 'return_report': False})
+    return population, pop_fit
+
+
+def island_ga(gain_matrix, islands, n_gens, migration_interval=10, n_migrants=2, topology='ring',
+              n_processes=None, seed=0, verbose=False, **ga_params):
+    """
+    Implements an island model of the genetic algorithm: several populations evolve in parallel
+    processes, and every migration_interval generations each island sends its best individuals
+    (get_n_elites) to another island, where they replace the worst ones.
+
+    Args:
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used
+        islands (int or list of dicts) : number of identical islands, or the ga parameters of each island
+                                         overriding ga_params (e.g. its own selector, crossover and mutator)
+        n_gens (int) : number of generations every island runs for
+        migration_interval (int) : number of generations between two migrations
+        n_migrants (int) : number of individuals each island sends at every migration
+        topology (str) : 'ring' to send to the next island, 'random' to send to a random other island
+        n_processes (int) : number of worker processes, the number of islands (at most the number of
+                            CPU cores) if None. With 1, the islands are evolved in this process
+        seed (int) : for the random number generators of the islands and of the migrations
+        verbose (bool) : If True, print the best gain of each island after every epoch
+        **ga_params : remaining arguments of ga shared by all the islands
+
+    Returns:
+        best_ind (list) : best individual found on any island
+        best_fit (float) : gain of the best individual
+
+    Raises:
+        ValueError : if the topology is unknown
+    """
+
+    if topology not in ('ring', 'random'):
+        raise ValueError(f'Unknown migration topology: {topology}')
+
+    island_params = [{} for _ in range(islands)] if isinstance(islands, int) else list(islands)
+    island_params = [{**ga_params, **params, 'gain_matrix': gain_matrix} for params in island_params]
+    n_islands = len(island_params)
+
+    rng = random.Random(seed)
+    migrate = get_n_elites(n_migrants)
+    populations = [None] * n_islands
+    best_ind, best_fit = None, -math.inf
+
+    # Only loaded for the runs using processes, like in brute_force
+    import multiprocessing
+
+    n_processes = n_processes or min(n_islands, multiprocessing.cpu_count())
+    pool = multiprocessing.Pool(processes=n_processes) if n_processes > 1 else None
+
+    for start in range(0, n_gens, migration_interval):
+        epoch_gens = min(migration_interval, n_gens - start)
+        # Every island and epoch gets its own reproducible seed
+        tasks = [({**params, 'n_gens': epoch_gens}, population,
+                  int(np.random.SeedSequence([seed, island, start]).generate_state(1)[0]))
+                 for island, (params, population) in enumerate(zip(island_params, populations))]
+        results = pool.map(island_epoch, tasks) if pool is not None else list(map(island_epoch, tasks))
+
+        populations = [population for population, _ in results]
+        fits = [list(pop_fit) for _, pop_fit in results]
+
+        for island, (population, pop_fit) in enumerate(zip(populations, fits)):
+            best_i = int(np.argmax(pop_fit))
+            if pop_fit[best_i] > best_fit:
+                best_ind, best_fit = deepcopy(population[best_i]), pop_fit[best_i]
+
+        if verbose:
+            print(f'{start + epoch_gens} gens | ' + ' | '.join(f'{max(pop_fit)}' for pop_fit in fits))
+
+        # Migrating between islands, unless this was the last epoch
+        if start + epoch_gens < n_gens and n_islands > 1:
+            migrants = [migrate(population, pop_fit) for population, pop_fit in zip(populations, fits)]
+            if topology == 'ring':
+                targets = [(island + 1) % n_islands for island in range(n_islands)]
+            else:
+                targets = [rng.choice([other for other in range(n_islands) if other != island]) for island in range(n_islands)]
+
+            for source, target in enumerate(targets):
+                elites, elite_fits = migrants[source]
+                # The migrants replace the worst individuals of the island they land on
+                for worst, elite, elite_fit in zip(np.argsort(fits[target]), elites, elite_fits):
+                    populations[target][worst] = deepcopy(elite)
+                    fits[target][worst] = elite_fit
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if isinstance(best_ind, np.ndarray):
+        best_ind = best_ind.tolist()
 
     return best_ind, best_fit
 
 
+
+
+# Gain matrix of the steady_state_ga evaluation workers, set once per process by init_evaluation_worker
+evaluation_gain_matrix = None
+
+
+def init_evaluation_worker(gain_matrix):
+    """
+    Initialize an evaluation worker process of steady_state_ga, keeping the gain matrix.
+
+    Args:
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used
+    """
+    global evaluation_gain_matrix
+    evaluation_gain_matrix = gain_matrix
+
+
+def evaluate_children(args):
+    """
+    Evaluates a batch of children of steady_state_ga in a worker process.
+
+    Args:
+        args (tuple) : (the evaluator, the children)
+
+    Returns:
+        list : the gains of the children
+    """
+
+    evaluator, children = args
+    return evaluator(children, evaluation_gain_matrix)
+
+
+def steady_state_ga(initializer,
+                    gain_matrix,
+                    evaluator,
+                    selector,
+                    crossover,
+                    mutator,
+                    pop_size, n_gens, p_xo, p_m, replacement='worst', tournament_size=3, batch_size=2,
+                    n_workers=1, seed=0, repair=False):
+    """
+    Implements a steady-state genetic algorithm: instead of replacing the whole population every
+    generation, small batches of children are bred, evaluated and inserted one at a time.
+
+    A child replaces an individual only if it has a higher gain and is not in the population yet,
+    so the best individual is never lost. The individual replaced is the worst of the population ('worst', found with a heap over
+    the gains) or the worst of tournament_size random individuals ('tournament').
+
+    With several workers, batches are evaluated in a process pool while the next ones are bred,
+    and inserted in the order they finish, so runs are only reproducible with a single worker.
+
+    Args:
+        initializer (function) : generates an initial population of individuals (matrices are turned into lists)
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used.
+                                                 A Problem is also passed to the initializer and the operators
+                                                 (see operator_problem for plain matrices)
+        evaluator (function) : evaluates the gain of the population of individuals
+        selector (function) : selects an individual from the population based on their gain
+        crossover (function) : performs a crossover technique on two parents to generate offspring
+        mutator (function) : performs a mutation technique on an individual to  establish genetic diversity
+        pop_size (int) : population size
+        n_gens (int) : number of generations, pop_size children being bred per generation
+        p_xo (float) : probability of crossover
+        p_m (float): probability of mutation
+        replacement (str) : 'worst' or 'tournament', the individual replaced by a better child
+        tournament_size (int) : number of individuals drawn for the 'tournament' replacement
+        batch_size (int) : number of children bred and evaluated at once
+        n_workers (int) : number of worker processes evaluating the children, none if 1
+        seed(int) : for the random number generator
+        repair (bool) : If True, children breaking the constraints are repaired (repair_constraints_batch)
+                        instead of being thrown away and bred again
+
+    Returns:
+        best_ind (list) : best individual of the final population, with the placeholder 0 if it skips KS
+        best_fit (float) : gain of the best individual
+
+    Raises:
+        ValueError : if the replacement policy is unknown
+    """
+
+    if replacement not in ('worst', 'tournament'):
+        raise ValueError(f'Unknown replacement policy: {replacement}')
+
+    # Getting up the seed
+    random.seed(seed)
+    np.random.seed(seed)
+
+    problem = operator_problem(gain_matrix)
+    operator_args = {} if problem is None else {'problem': problem}
+
+    population = initializer(pop_size, **operator_args)
+    if isinstance(population, np.ndarray):
+        population = population.tolist()
+    pop_fit = list(evaluator(deepcopy(population), gain_matrix))
+
+    # Min-heap of (gain, entry, slot): entries of replaced individuals are dropped when they reach the top
+    entries = count()
+    slot_entry = [next(entries) for _ in population]
+    heap = [(fit, entry, slot) for slot, (fit, entry) in enumerate(zip(pop_fit, slot_entry))]
+    heapq.heapify(heap)
+
+    # Children already in the population are not inserted again, which would soon fill it with copies
+    members = Counter(map(tuple, population))
+
+    def insert(children, fits):
+        for child, fit in zip(children, fits):
+            if tuple(child) in members:
+                continue
+
+            if replacement == 'worst':
+                while slot_entry[heap[0][2]] != heap[0][1]:
+                    heapq.heappop(heap)
+                slot = heap[0][2]
+            else:
+                slot = min(random.sample(range(len(population)), tournament_size), key=pop_fit.__getitem__)
+
+            if fit > pop_fit[slot]:
+                replaced = tuple(population[slot])
+                members[replaced] -= 1
+                if not members[replaced]:
+                    del members[replaced]
+                members[tuple(child)] += 1
+                population[slot], pop_fit[slot] = child, fit
+                slot_entry[slot] = next(entries)
+                heapq.heappush(heap, (fit, slot_entry[slot], slot))
+
+        # Rebuilding the heap once it is mostly made of replaced entries
+        if len(heap) > 2 * len(population):
+            heap[:] = [(fit, entry, slot) for slot, (fit, entry) in enumerate(zip(pop_fit, slot_entry))]
+            heapq.heapify(heap)
+
+    n_children = n_gens * pop_size
+    n_bred = 0
+
+    if n_workers > 1:
+        # Only loaded when the children are evaluated in parallel
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=init_evaluation_worker,
+                                 initargs=(gain_matrix,)) as executor:
+            pending = {}
+            while n_bred < n_children or pending:
+                # Keeping every worker busy while the finished batches are inserted
+                while n_bred < n_children and len(pending) < n_workers:
+                    children, _ = breed_children(population, pop_fit, selector, crossover, mutator, p_xo, p_m,
+                                              min(batch_size, n_children - n_bred), repair, problem)
+                    pending[executor.submit(evaluate_children, (evaluator, children))] = children
+                    n_bred += len(children)
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    insert(pending.pop(future), future.result())
+    else:
+        while n_bred < n_children:
+            children, _ = breed_children(population, pop_fit, selector, crossover, mutator, p_xo, p_m,
+                                      min(batch_size, n_children - n_bred), repair, problem)
+            # Evaluating copies, as the evaluator may mark the routes it skips areas of
+            insert(children, evaluator(deepcopy(children), gain_matrix))
+            n_bred += len(children)
+
+    # The routes were evaluated as copies, so the best one is marked with the placeholder here, as in ga
+    best_i = int(np.argmax(pop_fit))
+    best_ind = population[best_i].copy()
+    calculate_route_gain(best_ind, gain_matrix)
+    return best_ind, pop_fit[best_i]
+
+
+def held_karp(gain_matrix):
+    """
+    Finds the optimal route with a bitmask dynamic programming (Held-Karp) over the gain matrix.
+
+    The constraints of no_constraint are enforced while the routes are built, and the KS skip of
+    calculate_route_gain is handled by a second pass where KS is always skipped (which requires
+    DV to directly follow QS). The better of both passes is the provable optimum.
+
+    Args:
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used
+
+    Returns:
+        best_ind (list) : optimal route, with the placeholder 0 if skipping KS is better
+        best_fit (float) : gain of the optimal route
+
+    Raises:
+        ValueError : if no route satisfies the constraints
+    """
+
+    # Free areas are nodes 0, 1, ... in ascending order and the depot (Dirtmouth) is the last node
+    problem = problem_rules(gain_matrix)
+    gains = np.asarray(gain_values(gain_matrix), dtype=np.float64)
+    n = len(problem.areas)
+    nodes = [area - 1 for area in problem.areas] + [problem.depot - 1]
+    gains = gains[np.ix_(nodes, nodes)]
+    depot = n
+    node = {area: index for index, area in enumerate(problem.areas)}
+    node[problem.depot] = depot
+
+    # Positions allowed for each area (RG in the last half)
+    lower = np.ones(n, dtype=int)
+    upper = np.full(n, n)
+    feasible = True
+    for bound in problem.position_bounds:
+        if bound.area == problem.depot:
+            # The depot is always found at the start of the route
+            feasible &= (bound.lower or 0) <= 0
+        elif bound.area in node:
+            lower[node[bound.area]] = max(lower[node[bound.area]], bound.lower or 1)
+            upper[node[bound.area]] = min(upper[node[bound.area]], n if bound.upper is None else bound.upper)
+
+    # Areas that cannot come right before each area (QG before CS)
+    banned_before = [[] for _ in range(n)]
+    for ban in problem.adjacency_bans:
+        if ban.first in node and ban.second in node and node[ban.second] != depot:
+            banned_before[node[ban.second]].append(node[ban.first])
+
+    # The skip rule only applies when all its areas are in the problem
+    skip = problem.skip_rule
+    if skip is not None and all(area in problem.areas for area in skip):
+        ks, qs, dv = node[skip.skipped], node[skip.before], node[skip.after]
+        passes = (False, True)
+    else:
+        ks = qs = dv = None
+        passes = (False,)
+
+    # Masks grouped by number of visited areas
+    masks = np.arange(1 << n)
+    visited = np.array([bin(mask).count('1') for mask in masks])
+
+    # A state is (visited areas, last area, KS pending, DV followed QS). While KS is pending (it was
+    # just skipped) the last area is the one before KS, and the next edge jumps over KS.
+    # Parents are stored as last * 4 + pending * 2 + followed.
+    last_index = np.arange(n + 1)[:, None, None]
+    pending_index = np.arange(2)[None, :, None]
+    followed_index = np.arange(2)[None, None, :]
+
+    best_ind, best_fit = None, -np.inf
+
+    for skip_ks in passes if feasible else ():
+
+        value = np.full((1 << n, n + 1, 2, 2), -np.inf)
+        parent = np.zeros((1 << n, n + 1, 2, 2), dtype=np.intp)
+        value[0, depot, 0, 0] = 0
+
+        for count in range(n):
+            layer = masks[visited == count]
+
+            for area in range(n):
+
+                # Ensure the area is within its positions (RG in the last half)
+                if not lower[area] <= count + 1 <= upper[area]:
+                    continue
+
+                source = layer[(layer >> area) & 1 == 0]
+                target = source | (1 << area)
+                current = value[source]
+
+                if skip_ks and area == ks:
+                    # Skipping KS: nothing is gained until the next area
+                    candidate = current[:, :, 0, :].copy()
+                    candidate[:, banned_before[area], :] = -np.inf
+                    better = candidate > value[target, :, 1, :]
+                    value[target, :, 1, :] = np.where(better, candidate, value[target, :, 1, :])
+                    parent[target, :, 1, :] = np.where(better, last_index[:, 0] * 4 + followed_index[0], parent[target, :, 1, :])
+                    continue
+
+                # Edge from the last area, or jumping over a skipped KS (counted twice, like calculate_route_gain)
+                edge = np.where(pending_index == 1, 2 * gains[:, area][:, None, None], gains[:, area][:, None, None])
+                candidate = current + edge
+
+                # Ensuring an area is not visited right after a banned one (CS right after QG)
+                candidate[:, banned_before[area], 0, :] = -np.inf
+                if ks in banned_before[area]:
+                    candidate[:, :, 1, :] = -np.inf
+
+                followed = followed_index | ((last_index == qs) & (pending_index == 0) & (area == dv))
+
+                for flag in (0, 1):
+                    options = np.where(followed == flag, candidate, -np.inf).reshape(len(source), -1)
+                    choice = np.argmax(options, axis=1)
+                    option_value = options[np.arange(len(source)), choice]
+                    better = option_value > value[target, area, 0, flag]
+                    value[target[better], area, 0, flag] = option_value[better]
+                    parent[target[better], area, 0, flag] = choice[better]
+
+        # Back to the depot, the skipping pass only counts if DV directly followed QS
+        back = np.where(pending_index == 1, 2 * gains[:, depot][:, None, None], gains[:, depot][:, None, None])
+        final = value[-1] + back
+        if skip_ks:
+            final[:, :, 0] = -np.inf
+
+        last, pending, flag = np.unravel_index(np.argmax(final), final.shape)
+        if final[last, pending, flag] <= best_fit:
+            continue
+
+        # Rebuilding the route from the parents
+        route = []
+        mask = (1 << n) - 1
+        while mask:
+            area = ks if pending else last
+            route.append(problem.areas[area])
+            code = parent[mask, last, pending, flag]
+            mask ^= 1 << area
+            last, pending, flag = code // 4, (code // 2) % 2, code % 2
+
+        best_ind = [problem.depot] + route[::-1] + [problem.depot]
+        best_fit = final.max()
+
+    if best_ind is None:
+        raise ValueError('No route satisfies the constraints of the problem')
+
+    # Evaluating the route as the GA does, which also marks the skipped KS with the placeholder
+    best_fit = calculate_route_gain(best_ind, gain_matrix)
+
+    return best_ind, best_fit
+
+
+def solve(gain_matrix, max_exact_areas=12, **ga_params):
+    """
+    Finds a route with the exact held_karp solver when the instance is small enough, and with
+    the genetic algorithm otherwise.
+
+    Args:
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used
+        max_exact_areas (int) : largest number of areas (besides the depot) solved exactly
+        **ga_params : remaining arguments of ga, used for larger instances
+
+    Returns:
+        best_ind (list) : best route found
+        best_fit (float) : gain of the best route found
+    """
+
+    if len(problem_rules(gain_matrix).areas) <= max_exact_areas:
+        return held_karp(gain_matrix)
+
+    return ga(gain_matrix=gain_matrix, **ga_params)
+
+
+def brute_force_chunk(args):
+    """
+    Evaluates one chunk of permutation ranks for brute_force, keeping its best valid routes.
+
+    Args:
+        args (tuple) : (first rank, last rank (excluded), gain matrix, number of routes to keep)
+
+    Returns:
+        tuple : (best routes, their gains, number of valid routes in the chunk)
+    """
+
+    start, stop, gain_matrix, top_k = args
+
+    problem = problem_rules(gain_matrix)
+    routes = routes_from_ranks(np.arange(start, stop), problem)
+    routes = routes[no_constraint_batch(routes, problem)]
+    gains = calculate_population_gain_batch(routes, gain_matrix)
+
+    best = np.argsort(-gains, kind='stable')[:top_k]
+    return routes[best], gains[best], len(routes)
+
+
+def brute_force(gain_matrix, top_k=1, chunk_size=65536, n_processes=1, verbose=False):
+    """
+    Finds the optimal route by evaluating every valid route, streaming the permutations of the
+    areas in chunks of ranks that are decoded, checked and evaluated with NumPy.
+
+    Only one chunk per process and the running top_k routes are kept in memory. The number of
+    routes grows as the factorial of the number of areas, so this is meant as a reference for
+    small instances and as a benchmark of the evaluator.
+
+    Args:
+        gain_matrix (list of lists or Problem) : data matrix cointaining the gain of each location to be used
+        top_k (int) : number of best routes to keep
+        chunk_size (int) : number of permutations evaluated at once
+        n_processes (int) : if more than 1, chunks are split across a process pool
+        verbose (bool) : If True, print the throughput at the end
+
+    Returns:
+        best_ind (list) : optimal route
+        best_fit (float) : gain of the optimal route
+        report (dict) : the top_k routes and gains, the number of routes checked and valid,
+                        the run time and the throughput (routes per second)
+
+    Raises:
+        ValueError : if no route satisfies the constraints
+    """
+
+    start_time = time.time()
+    problem = problem_rules(gain_matrix)
+    n_routes = math.factorial(len(problem.areas))
+    tasks = ((start, min(start + chunk_size, n_routes), gain_matrix, top_k) for start in range(0, n_routes, chunk_size))
+
+    top_routes = np.empty((0, problem.n_areas + 1), dtype=problem.dtype)
+    top_gains = np.empty(0)
+    n_valid = 0
+
+    if n_processes > 1:
+        import multiprocessing
+
+        pool = multiprocessing.Pool(processes=n_processes)
+        results = pool.imap(brute_force_chunk, tasks)
+    else:
+        pool = None
+        results = map(brute_force_chunk, tasks)
+
+    # Merging the best routes of every chunk, in rank order so ties keep the first route found
+    for routes, gains, chunk_valid in results:
+        top_routes = np.concatenate([top_routes, routes])
+        top_gains = np.concatenate([top_gains, gains])
+        best = np.argsort(-top_gains, kind='stable')[:top_k]
+        top_routes, top_gains = top_routes[best], top_gains[best]
+        n_valid += chunk_valid
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if not n_valid:
+        raise ValueError('No route satisfies the constraints of the problem')
+
+    run_time = time.time() - start_time
+    report = {'top': list(zip(top_routes.tolist(), top_gains.tolist())),
+              'n_routes': n_routes,
+              'n_valid': n_valid,
+              'run_time': run_time,
+              'routes_per_sec': n_routes / run_time}
+
+    if verbose:
+        print(f'{n_routes} routes ({n_valid} valid) in {run_time:.2f}s: {report["routes_per_sec"]:.0f} routes/sec')
+
+    return top_routes[0].tolist(), top_gains[0], report
+
@@ -0,0 +1,82 @@
+import numpy as np
+from algorithm.utils import population_diversity
+
+__all__ = ['HISTORY_KEYS', 'new_history', 'record_generation', 'history_arrays', 'plot_history']
+
+# Values recorded for every generation of a run of ga, the initial population first
+HISTORY_KEYS = ('best', 'mean', 'std', 'diversity', 'n_evals', 'breed_time', 'eval_time')
+
+
+def new_history():
+    """
+    Creates an empty history of a run of ga, filled by record_generation
+
+    Returns:
+        dict : one empty list per key of HISTORY_KEYS
+    """
+    return {key: [] for key in HISTORY_KEYS}
+
+
+def record_generation(history, population, pop_fit, n_evals, breed_time, eval_time):
+    """
+    Records a generation in the history of a run
+
+    Args:
+        history (dict) : history of the run (see new_history)
+        population (list or numpy.ndarray) : population of the generation
+        pop_fit (list) : gains of the population
+        n_evals (int) : number of individuals given to the evaluator for the generation
+        breed_time (float) : time spent selecting, crossing and mutating the offspring, in seconds
+        eval_time (float) : time spent evaluating the offspring, in seconds
+    """
+    fits = np.asarray(pop_fit, dtype=np.float64)
+    history['best'].append(fits.max())
+    history['mean'].append(fits.mean())
+    history['std'].append(fits.std())
+    history['diversity'].append(population_diversity(population))
+    history['n_evals'].append(n_evals)
+    history['breed_time'].append(breed_time)
+    history['eval_time'].append(eval_time)
+
+
+def history_arrays(history):
+    """
+    Turns the history of a run into NumPy arrays
+
+    Args:
+        history (dict) : history of the run (see new_history)
+
+    Returns:
+        dict : one array per key of HISTORY_KEYS, indexed by generation
+    """
+    return {key: np.asarray(values) for key, values in history.items()}
+
+
+def plot_history(history, show=True):
+    """
+    Plots the best gain of every generation of a run, and the mean gain with its standard deviation
+    when the history has them. Matplotlib is only imported here, when a plot is asked for.
+
+    Args:
+        history (dict) : history of the run, from the report of ga (lists work as well as arrays)
+        show (bool) : If True, show the plot (blocking), otherwise leave it on the current figure
+    """
+    import matplotlib.pyplot as plt
+
+    best = np.asarray(history['best'])
+    generations = np.arange(len(best))
+
+    plt.plot(generations, best, label='Best')
+    if 'mean' in history and 'std' in history:
+        mean, std = np.asarray(history['mean']), np.asarray(history['std'])
+        plt.plot(generations, mean, linestyle='--', label='Mean')
+        plt.fill_between(generations, mean - std, mean + std, alpha=0.2)
+        plt.legend()
+
+    plt.xlabel('Generation')
+    plt.xticks(generations)
+    plt.ylabel('Fitness')
+    plt.title('Best Fitness Over Generations')
+
+    if show:
+        plt.show()
@@ -0,0 +1,244 @@
+import csv
+import json
+import queue
+import threading
+import numpy as np
+from contextlib import contextmanager
+
+__all__ = ['log_format', 'write_rows', 'read_generation_log', 'GenerationLog', 'QueueLog',
+           'shared_generation_log']
+
+
+def log_format(path):
+    """
+    Gets the format of a generation log from its extension
+
+    Args:
+        path (str) : path to the log file
+
+    Returns:
+        str : 'npy' for .npy files, 'csv' otherwise
+    """
+    return 'npy' if str(path).endswith('.npy') else 'csv'
+
+
+def write_rows(path, rows, format):
+    """
+    Appends rows (seed, generation, best gain, elite) to a generation log file.
+
+    CSV files get one line per row, the elite written as a list. Binary (npy) files get one block of
+    columns per call: the seeds, the generations, the gains, the lengths of the elites and all the
+    elites one after the other, each column saved with numpy.save (see read_generation_log).
+
+    Args:
+        path (str) : path to the log file
+        rows (list) : rows to append
+        format (str) : 'csv' or 'npy'
+    """
+    if not rows:
+        return
+
+    if format == 'csv':
+        with open(path, 'a', newline='') as file:
+            csv.writer(file).writerows(rows)
+        return
+
+    seeds, gens, fits, elites = zip(*rows)
+    with open(path, 'ab') as file:
+        np.save(file, np.array(seeds, dtype=np.int64))
+        np.save(file, np.array(gens, dtype=np.int32))
+        np.save(file, np.array(fits, dtype=np.float64))
+        np.save(file, np.array([np.size(elite) for elite in elites], dtype=np.int32))
+        np.save(file, np.concatenate([np.ravel(elite) for elite in elites]).astype(np.int16))
+
+
+def read_generation_log(path):
+    """
+    Reads a generation log written by GenerationLog, in either format.
+
+    Args:
+        path (str) : path to the log file
+
+    Returns:
+        list : the rows (seed, generation, best gain, elite), in the order they were written
+    """
+    if log_format(path) == 'csv':
+        with open(path, newline='') as file:
+            return [(int(seed), int(gen), float(fit), json.loads(elite)) for seed, gen, fit, elite in csv.reader(file)]
+
+    rows = []
+    with open(path, 'rb') as file:
+        while file.peek(1):
+            seeds, gens, fits, lengths, areas = (np.load(file) for _ in range(5))
+            elites = np.split(areas, np.cumsum(lengths)[:-1]) if len(lengths) else []
+            rows.extend(zip(seeds.tolist(), gens.tolist(), fits.tolist(), [elite.tolist() for elite in elites]))
+    return rows
+
+
+class GenerationLog:
+    """
+    Log of the best individual of each generation of ga, kept in memory and written to the file in
+    batches of flush_every rows, and when the log is closed.
+
+    With background=True, the batches are written by a thread, so the run is never held up by the file.
+    """
+
+    def __init__(self, path, format=None, flush_every=256, background=False):
+        """
+        Args:
+            path (str) : path to the log file, appended to
+            format (str) : 'csv' or 'npy' (compact binary columns), from the extension of the path if None
+            flush_every (int) : number of rows kept in memory before they are written
+            background (bool) : If True, the rows are written by a background thread
+        """
+        self.path = path
+        self.format = format or log_format(path)
+        self.flush_every = flush_every
+        self.rows = []
+        self.batches = None
+        self.writer = None
+
+        if background:
+            self.batches = queue.Queue()
+            self.writer = threading.Thread(target=self.write_batches, daemon=True)
+            self.writer.start()
+
+    def log(self, seed, gen, fit, elite):
+        """
+        Adds the best individual of a generation to the log.
+
+        Args:
+            seed (int) : seed of the run
+            gen (int) : generation
+            fit (float) : gain of the best individual
+            elite (list) : best individual
+        """
+        self.rows.append((seed, gen, fit, elite))
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def extend(self, rows):
+        """
+        Adds rows (seed, generation, best gain, elite) to the log.
+
+        Args:
+            rows (list) : rows to add
+        """
+        self.rows.extend(rows)
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Writes the rows kept in memory (hands them to the writer thread in the background)."""
+        rows, self.rows = self.rows, []
+        if self.batches is not None:
+            self.batches.put(rows)
+        else:
+            write_rows(self.path, rows, self.format)
+
+    def write_batches(self):
+        """Writes the batches of rows handed to the background thread, until the log is closed."""
+        for rows in iter(self.batches.get, None):
+            write_rows(self.path, rows, self.format)
+
+    def close(self):
+        """Writes the remaining rows, and waits for the background thread to finish."""
+        self.flush()
+        if self.writer is not None:
+            self.batches.put(None)
+            self.writer.join()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class QueueLog:
+    """
+    Generation log sending its rows, in batches, to a queue drained by a single writer (see
+    shared_generation_log). Made with a multiprocessing manager queue, it can be passed to ga in the
+    worker processes of grid_search, and every run ends up in the same file without interleaving.
+    """
+
+    def __init__(self, rows_queue, path, flush_every=256):
+        """
+        Args:
+            rows_queue (queue.Queue or multiprocessing queue) : queue the batches of rows are put in
+            path (str) : path to the log file the queue is written to, for reference
+            flush_every (int) : number of rows kept in memory before they are sent
+        """
+        self.queue = rows_queue
+        self.path = path
+        self.flush_every = flush_every
+        self.rows = []
+
+    def log(self, seed, gen, fit, elite):
+        """
+        Adds the best individual of a generation to the log.
+
+        Args:
+            seed (int) : seed of the run
+            gen (int) : generation
+            fit (float) : gain of the best individual
+            elite (list) : best individual
+        """
+        self.rows.append((seed, gen, float(fit), list(elite)))
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Sends the rows kept in memory to the writer."""
+        if self.rows:
+            self.queue.put(self.rows)
+            self.rows = []
+
+    def close(self):
+        """Sends the remaining rows to the writer."""
+        self.flush()
+
+    def __getstate__(self):
+        # Rows not sent yet stay with the process that logged them
+        return {**self.__dict__, 'rows': []}
+
+    def __repr__(self):
+        # Shows the file the rows end up in rather than the queue proxy
+        return f'QueueLog({self.path!r})'
+
+
+@contextmanager
+def shared_generation_log(path, format=None, flush_every=256):
+    """
+    Opens a generation log written by a single thread of this process, fed by a multiprocessing
+    queue the worker processes send their rows to.
+
+    Args:
+        path (str) : path to the log file, appended to
+        format (str) : 'csv' or 'npy', from the extension of the path if None
+        flush_every (int) : number of rows the workers keep before sending them, and the writer before writing them
+
+    Yields:
+        QueueLog : the log to pass to ga as log_path, in any process
+    """
+    import multiprocessing
+
+    manager = multiprocessing.Manager()
+    rows_queue = manager.Queue()
+    log = GenerationLog(path, format, flush_every)
+
+    def drain():
+        for rows in iter(rows_queue.get, None):
+            log.extend(rows)
+
+    writer = threading.Thread(target=drain, daemon=True)
+    writer.start()
+
+    try:
+        yield QueueLog(rows_queue, path, flush_every)
+    finally:
+        rows_queue.put(None)
+        writer.join()
+        log.close()
+        manager.shutdown()
@@ -0,0 +1,91 @@
+import time
+from collections import Counter, defaultdict
+
+__all__ = ['Profiler', 'untimed']
+
+
+def untimed(phase, function):
+    """
+    Leaves the function of a phase as it is, for runs of ga without a profiler
+
+    Args:
+        phase (str) : name of the phase
+        function (function) : function running the phase
+
+    Returns:
+        function : the same function
+    """
+    return function
+
+
+class Profiler:
+    """
+    Profile of runs of ga: cumulative time and number of calls of each phase (selection, crossover,
+    mutation, constraints, repair, breeding, evaluation, elitism, logging), number of children
+    rejected by the constraints after each operator, and number of parents whose retries were
+    all exhausted. Several runs given the same profiler add up.
+
+    ga only times the phases by wrapping their functions (see timed) when it is given a profiler,
+    so runs without one are left as they are.
+    """
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.calls = Counter()
+        self.rejections = Counter()
+        self.exhausted_retries = 0
+
+    def timed(self, phase, function):
+        """
+        Wraps the function of a phase so that its calls are timed and counted.
+
+        Args:
+            phase (str) : name of the phase
+            function (function) : function running the phase
+
+        Returns:
+            function : the function, timed
+        """
+        times, calls = self.times, self.calls
+
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            times[phase] += time.perf_counter() - start
+            calls[phase] += 1
+            return result
+
+        return run
+
+    def reject(self, operator):
+        """
+        Counts a pair of children rejected by the constraints.
+
+        Args:
+            operator (function) : the last operator applied to the children, None if they were copied from their parents
+        """
+        self.rejections['reproduction' if operator is None else operator.__name__] += 1
+
+    def exhaust(self):
+        """Counts parents whose children broke the constraints in every retry."""
+        self.exhausted_retries += 1
+
+    def report(self):
+        """
+        Gets the profile.
+
+        Returns:
+            dict : time and calls of each phase (the slowest first), rejections per operator and exhausted retries
+        """
+        phases = sorted(self.times, key=self.times.get, reverse=True)
+        return {'phases': {phase: {'time': self.times[phase], 'calls': self.calls[phase]} for phase in phases},
+                'rejections': dict(self.rejections),
+                'exhausted_retries': self.exhausted_retries}
+
+    def __str__(self):
+        total = sum(self.times.values()) or 1
+        lines = [f'{"phase":<14}{"time (s)":>10}{"share":>8}{"calls":>10}']
+        for phase, profile in self.report()['phases'].items():
+            lines.append(f'{phase:<14}{profile["time"]:>10.4f}{profile["time"] / total:>8.1%}{profile["calls"]:>10}')
+        lines.append(f'rejections: {dict(self.rejections)}, exhausted retries: {self.exhausted_retries}')
+        return '\n'.join(lines)
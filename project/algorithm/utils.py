@@ -1,19 +1,21 @@
-import random
 import numpy as np
 
+__all__ = ['get_elite_max', 'get_n_elites', 'population_diversity']
+
 
 def get_elite_max(population, pop_fit):
     """
     Gets the elite individual and its corresponding maximum gain value from a given population
 
     Args:
-        population (list) : collection of individuals in the population
+        population (list or numpy.ndarray) : collection of individuals in the population
         pop_fit (list) : collection of gain values corresponding to each individual in the population
 
     Returns:
         list : containing the elite individual and its maximum gain value
     """
-    return [population[np.argmax(pop_fit)], max(pop_fit)]
+    best_i = np.argmax(pop_fit)
+    return [population[best_i], pop_fit[best_i]]
 
 
 def get_n_elites(n):
@@ -32,7 +34,7 @@ def get_n_elites(n):
         Gets all the elite individuals and their corresponding gain values from a given population into a list.
 
         Args:
-             population (list) : collection of individuals in the population
+             population (list or numpy.ndarray) : collection of individuals in the population
              pop_fit (list) : collection of gain values corresponding to each individual in the population
 
         Returns:
@@ -40,6 +42,24 @@ def get_n_elites(n):
         """
         # Getting the best n elites
         bests_i = np.argsort(pop_fit)[-n:]
+        # Populations stored as matrices keep their elites as a matrix
+        if isinstance(population, np.ndarray):
+            return population[bests_i], np.asarray(pop_fit)[bests_i]
         # Getting the fitnesses of the best n elites:
         return [population[i] for i in bests_i], [pop_fit[i] for i in bests_i]
     return get_elite
+
+
+def population_diversity(population):
+    """
+    Gets the share of distinct individuals in a given population
+
+    Args:
+        population (list or numpy.ndarray) : collection of individuals in the population
+
+    Returns:
+        float : number of distinct individuals divided by the population size, 1 if they are all different
+    """
+    if isinstance(population, np.ndarray):
+        return len(np.unique(population, axis=0)) / len(population)
+    return len(set(map(tuple, population))) / len(population)
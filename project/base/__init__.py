@@ -0,0 +1 @@
+"""Routes, populations and problem instances of the route optimization."""
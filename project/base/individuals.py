@@ -1,68 +1,114 @@
 import random
-from base.data import generate_geo_matrix
+import numpy as np
+from base.problem import default_problem, gain_values, problem_rules
 
+__all__ = ['no_constraint', 'create_individuals', 'edges_gain', 'calculate_route_gain',
+           'delta_route_gain', 'nums_to_initials', 'pre_operations', 'post_operations',
+           'fix_placeholder', 'fix_placeholder_batch', 'no_constraint_batch',
+           'repair_constraints_batch']
 
-def no_constraint(areas):
+
+def no_constraint(areas, problem=None):
     """
     Checks if a list of areas satisfies certain constraints.
 
     Args:
         areas (list): A list representing the visited areas.
+        problem (Problem): The problem whose constraints are checked. Defaults to the Hollow Knight ones.
 
     Returns:
         bool: True if the areas satisfy the constraints, False otherwise.
    """
-    
-    # Ensuring CS is not visited right after QG
-    if 5 in areas and 6 in areas:
-        cs_index = areas.index(6)
-        qg_index = areas.index(5)
-
-        if cs_index == qg_index + 1:
-            return False
-            
-    # Ensure RG is in the last half
-    if 8 in areas:
-        rg_index = areas.index(8)
-        if rg_index < len(areas) // 2:
-            return False
-        
+
+    if problem is None:
+        problem = default_problem(len(areas) - 1)
+
+    # Ensuring an area is not visited right after a banned one (CS right after QG)
+    for ban in problem.adjacency_bans:
+        if ban.first in areas and ban.second in areas:
+            second_index = areas.index(ban.second)
+            first_index = areas.index(ban.first)
+
+            if second_index == first_index + 1:
+                return False
+
+    # Ensure an area is within its positions (RG in the last half)
+    for bound in problem.position_bounds:
+        if bound.area in areas:
+            area_index = areas.index(bound.area)
+            if bound.lower is not None and area_index < bound.lower:
+                return False
+            if bound.upper is not None and area_index > bound.upper:
+                return False
+
     # Avoid having a repeated area (could happen after a crossover/mutation)   
-    for area in areas[1:-1]:  
-        if areas.count(area) > 1:
-            return False
+    inner_areas = areas[1:-1]
+    if len(set(inner_areas)) < len(inner_areas) or areas[0] in inner_areas or areas[-1] in inner_areas:
+        return False
 
       
     return True
 
 
-def create_individuals():
+def create_individuals(problem=None):
     """
-    Create a random individual (route) represented as a list with random numbers from 2 to 10,
-    ensuring it starts and ends at Dirtmouth (1). Return if it respects the constraints.
+    Create a random individual (route) represented as a list with the areas in random order,
+    ensuring it starts and ends at the depot (Dirtmouth, 1). Return if it respects the constraints.
+
+    Args:
+        problem (Problem): The problem to draw the route for. Defaults to the Hollow Knight one.
 
     Returns:
         list: A random individual.
     """
-    
+
+    if problem is None:
+        problem = default_problem()
+
     while True:
 
-        # Numbers from 2 to 10 representing areas
-        areas = list(range(2, 11)) 
+        # Every area but the depot (numbers from 2 to 10 for Hollow Knight)
+        areas = list(problem.areas)
         random.shuffle(areas) 
 
         # Start at Dirtmouth (1)
-        areas.insert(0, 1)  
+        areas.insert(0, problem.depot)
 
         # End at Dirtmouth (1)
-        areas.append(1)  
+        areas.append(problem.depot)
         
-        if no_constraint(areas):
+        if no_constraint(areas, problem):
             return areas
         else:
             continue
 
 
+def edges_gain(gain_matrix, current_areas, next_areas):
+    """
+    Add up, in order, the gains of the edges from each area of current_areas to the area at the same
+    position of next_areas.
+
+    A NumPy gain matrix (e.g. a Problem's, or one in shared memory) is indexed once for all the edges
+    rather than area by area, with the same result.
+
+    Args:
+        gain_matrix (list of lists or numpy.ndarray): Matrix representing gains between areas.
+        current_areas (list): The areas each edge starts from.
+        next_areas (list): The areas each edge goes to.
+
+    Returns:
+        float: The gain of the edges.
+    """
+
+    if isinstance(gain_matrix, np.ndarray):
+        return sum(gain_matrix[np.array(current_areas) - 1, np.array(next_areas) - 1].tolist())
+
+    gain = 0
+    for current_area, next_area in zip(current_areas, next_areas):
+        gain += gain_matrix[current_area - 1][next_area - 1]
+    return gain
+
+
 def calculate_route_gain(individual, gain_matrix):
     """
     Calculate the gain of a given route (individual) based on the gain matrix.
@@ -74,26 +120,29 @@ def calculate_route_gain(individual, gain_matrix):
    
     Args:
         individual (list): The individual array representing the route.
-        gain_matrix (list of lists): Matrix representing gains between areas.
+        gain_matrix (list of lists or Problem): Matrix representing gains between areas, or the
+                                                problem holding it and its skip rule.
 
     Returns:
         float: The gain of the route.
     """
 
+    skip = problem_rules(gain_matrix).skip_rule
+    gain_matrix = gain_values(gain_matrix)
+
     gain_with_placeholder = 0
-    gain_without_placeholder = 0
     areas = individual.copy() 
     
-    if 4 in areas and 9 in areas:
-        qs_index = areas.index(4)
-        dv_index = areas.index(9)
+    if skip is not None and skip.before in areas and skip.after in areas:
+        qs_index = areas.index(skip.before)
+        dv_index = areas.index(skip.after)
 
         # Check if DV directly follows QS
         if dv_index == qs_index + 1: 
 
             # Check if KS is in the list
-            if 7 in areas:  
-                ks_index = areas.index(7)
+            if skip.skipped in areas:
+                ks_index = areas.index(skip.skipped)
 
                 # Replace KS with a placeholder
                 areas[ks_index] = 0  
@@ -104,6 +153,8 @@ def calculate_route_gain(individual, gain_matrix):
     
     # Calculate gain for the route with placeholder
     if placeholder_index is not None:
+        current_areas = []
+        next_areas = []
         for i in range(len(areas) - 1):
 
             current_area = areas[i]
@@ -121,27 +172,25 @@ def calculate_route_gain(individual, gain_matrix):
                 # Skip over the placeholder
                 next_area = areas[i + 2] 
 
-            gain_with_placeholder += gain_matrix[current_area - 1][next_area - 1]
+            current_areas.append(current_area)
+            next_areas.append(next_area)
+
+        gain_with_placeholder = edges_gain(gain_matrix, current_areas, next_areas)
                     
                               
-    # Calculate gain for the route without the placeholder    
-    for i in range(len(areas) - 1):
-
-        # If individual has a placeholder, calculate it normally with KS back on it
-        if placeholder_index is not None:
-            areas[placeholder_index] = 7
+    # If individual has a placeholder, calculate it normally with KS back on it
+    if placeholder_index is not None and skip is not None:
+        areas[placeholder_index] = skip.skipped
 
-        current_area = areas[i]
-        next_area = areas[i + 1]
-
-        gain_without_placeholder += gain_matrix[current_area - 1][next_area - 1]
+    # Calculate gain for the route without the placeholder    
+    gain_without_placeholder = edges_gain(gain_matrix, areas[:-1], areas[1:])
     
     
     # If gain is bigger with a placeholder, then we replace in the actual individual KS for said placeholder 0 
     if gain_with_placeholder >= gain_without_placeholder and placeholder_index is not None:
-        if 7 in individual: 
+        if skip is not None and skip.skipped in individual:
 
-            ks_index = individual.index(7)
+            ks_index = individual.index(skip.skipped)
             individual[ks_index] = 0
         return gain_with_placeholder
     
@@ -150,6 +199,46 @@ def calculate_route_gain(individual, gain_matrix):
 
 
 
+def delta_route_gain(parent_gain, delta, individual, gain_matrix):
+    """
+    Calculate the gain of a mutated route from the gain of the route it was mutated from,
+    only adding up the edges the mutation changed (the edge-delta record the mutators return
+    with with_delta=True).
+
+    Skipping KS depends on the whole route, so routes where DV directly follows QS, and
+    mutations without a record, are evaluated in full with calculate_route_gain.
+
+    Args:
+        parent_gain (float): The gain of the route before the mutation.
+        delta (tuple): (removed edges, added edges) of the mutation, or None.
+        individual (list): The mutated route.
+        gain_matrix (list of lists or Problem): Matrix representing gains between areas.
+
+    Returns:
+        float: The gain of the route.
+    """
+
+    skip = problem_rules(gain_matrix).skip_rule
+
+    if delta is None:
+        return calculate_route_gain(individual, gain_matrix)
+
+    # Check if DV directly follows QS, which could make skipping KS better
+    if skip is not None and skip.before in individual and skip.after in individual:
+        if individual.index(skip.after) == individual.index(skip.before) + 1:
+            return calculate_route_gain(individual, gain_matrix)
+
+    gain_matrix = gain_values(gain_matrix)
+    removed_edges, added_edges = delta
+
+    for current_area, next_area in removed_edges:
+        parent_gain -= gain_matrix[current_area - 1][next_area - 1]
+
+    for current_area, next_area in added_edges:
+        parent_gain += gain_matrix[current_area - 1][next_area - 1]
+
+    return parent_gain
+
 def nums_to_initials(individual, area_map):
     """
     Converts a list of area indices to their corresponding initials.
@@ -182,49 +271,208 @@ def pre_operations(individual):
     return individual[1:-1]
 
 
-def post_operations(modified_individual):
+def post_operations(modified_individual, problem=None):
     """
     Restore the start and end points to the individual after genetic operations.
 
     Args:
         modified_individual (list): The modified individual without the start and end points.
+        problem (Problem): The problem giving the depot. Defaults to Dirtmouth.
 
     Returns:
         list: The individual with Dirtmouth reinserted at the start and end.
     """
 
+    depot = 1 if problem is None else problem.depot
+
     # Add Dirtmouth (D = 1) to the start and end of the route
-    return [1] + modified_individual + [1]
+    return [depot] + modified_individual + [depot]
 
 
-def fix_placeholder(individual):
+def fix_placeholder(individual, problem=None):
     """
     Fix the placeholder in a individual list, in the case its needed after a mutation or crossover.
 
     Args:
         individual (list): The individual route represented as a list.
+        problem (Problem): The problem giving the skip rule. Defaults to skipping KS between QS and DV.
 
     Returns:
         list: The individual route with the placeholder fixed, if necessary.
     """
 
+    skip = (problem or default_problem()).skip_rule
+    if skip is None:
+        return individual
+
     # Find the index of the placeholder (0) in the individual
     placeholder_index = individual.index(0) if 0 in individual else None
 
     if placeholder_index is not None:
 
-        dv_index = individual.index(9) if 9 in individual else None
-        qs_index = individual.index(4) if 4 in individual else None
+        dv_index = individual.index(skip.after) if skip.after in individual else None
+        qs_index = individual.index(skip.before) if skip.before in individual else None
         
         # KS should be placed back if DV does not directly follow QS
         if dv_index is not None and qs_index is not None and dv_index != qs_index + 1:
 
             # Replace placeholder with KS
-            individual[placeholder_index] = 7  
+            individual[placeholder_index] = skip.skipped
 
     return individual
 
 
+def fix_placeholder_batch(routes, problem=None):
+    """
+    Fix the placeholder in every route of a matrix at once, the batch version of fix_placeholder.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row. It is fixed in place.
+        problem (Problem): The problem giving the skip rule. Defaults to skipping KS between QS and DV.
+
+    Returns:
+        numpy.ndarray: The same matrix, with the placeholders fixed where needed.
+    """
+
+    skip = (problem or default_problem()).skip_rule
+    if skip is None:
+        return routes
+
+    rows = np.arange(len(routes))
+    placeholder = routes == 0
+    qs = routes == skip.before
+    dv = routes == skip.after
+
+    # KS should be placed back if DV does not directly follow QS
+    put_back = (placeholder.any(axis=1) & qs.any(axis=1) & dv.any(axis=1)
+                & (np.argmax(dv, axis=1) != np.argmax(qs, axis=1) + 1))
+    routes[rows[put_back], np.argmax(placeholder, axis=1)[put_back]] = skip.skipped
+
+    return routes
 
 
+def no_constraint_batch(routes, problem=None):
+    """
+    Checks the constraints of no_constraint for every route of a matrix at once.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row.
+        problem (Problem): The problem whose constraints are checked. Defaults to the Hollow Knight ones.
+
+    Returns:
+        numpy.ndarray: Boolean mask, True for the routes that satisfy the constraints.
+    """
+
+    if problem is None:
+        problem = default_problem(routes.shape[1] - 1)
+
+    rows = np.arange(len(routes))
+    valid = np.ones(len(routes), dtype=bool)
+
+    # Ensuring an area is not visited right after a banned one (CS right after QG)
+    for ban in problem.adjacency_bans:
+        qg = routes == ban.first
+        cs = routes == ban.second
+        valid &= ~(qg.any(axis=1) & cs.any(axis=1) & (np.argmax(cs, axis=1) == np.argmax(qg, axis=1) + 1))
+
+    # Ensure an area is within its positions (RG in the last half)
+    for bound in problem.position_bounds:
+        rg = routes == bound.area
+        rg_index = np.argmax(rg, axis=1)
+        if bound.lower is not None:
+            valid &= ~(rg.any(axis=1) & (rg_index < bound.lower))
+        if bound.upper is not None:
+            valid &= ~(rg.any(axis=1) & (rg_index > bound.upper))
+
+    # Avoid having a repeated area, counting the start and end points too
+    n_genes = int(routes.max(initial=0)) + 1
+    counts = np.bincount((routes + rows[:, None] * n_genes).ravel(), minlength=len(routes) * n_genes)
+    counts = counts.reshape(len(routes), n_genes)
+    valid &= ~(np.take_along_axis(counts, routes[:, 1:-1].astype(np.intp), axis=1) > 1).any(axis=1)
+
+    return valid
+
+
+def repair_constraints_batch(routes, problem=None):
+    """
+    Repairs, in place, the routes of a matrix that break the constraints of no_constraint.
+
+    Only the routes failing no_constraint_batch are touched, and the repair is deterministic:
+    repeated (or unknown) areas are replaced by the missing areas in ascending order, an area out
+    of its positions (RG) is moved to the nearest allowed one, and an area visited right after a
+    banned one (CS after QG) is swapped with it. Constraints that contradict each other may leave
+    a route invalid, so the result is worth checking with no_constraint_batch.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row, starting and ending at the depot.
+        problem (Problem): The problem whose constraints are repaired. Defaults to the Hollow Knight ones.
+
+    Returns:
+        numpy.ndarray: The same matrix, with the routes satisfying the constraints.
+    """
 
+    if problem is None:
+        problem = default_problem(routes.shape[1] - 1)
+
+    invalid = np.flatnonzero(~no_constraint_batch(routes, problem))
+    broken = routes[invalid].astype(np.intp)
+    n, length = broken.shape
+    rows = np.arange(n)
+
+    # Every area must appear once, KS possibly as the placeholder
+    inner = broken[:, 1:-1]
+    areas = inner if problem.skip_rule is None else np.where(inner == 0, problem.skip_rule.skipped, inner)
+    n_genes = max(problem.n_areas, int(areas.max(initial=0))) + 1
+    known = np.zeros(n_genes, dtype=bool)
+    known[problem.areas] = True
+
+    order = np.argsort(areas, axis=1, kind='stable')
+    sorted_areas = np.take_along_axis(areas, order, axis=1)
+    repeated = np.zeros_like(sorted_areas, dtype=bool)
+    repeated[:, 1:] = sorted_areas[:, 1:] == sorted_areas[:, :-1]
+    repeated |= ~known[np.clip(sorted_areas, 0, n_genes - 1)] | (sorted_areas < 0)
+
+    if repeated.any():
+        bad = np.zeros_like(repeated)
+        np.put_along_axis(bad, order, repeated, axis=1)
+        present = np.zeros((n, n_genes), dtype=bool)
+        present[np.nonzero(~repeated)[0], sorted_areas[~repeated]] = True
+        present[:, ~known] = True
+
+        # Both masks list rows in order, so the k-th bad slot of a row gets its k-th missing area
+        inner[bad] = np.nonzero(~present)[1]
+
+    # Moving an area can break another constraint, so the moves are repeated while routes are invalid
+    positions = np.arange(length)
+    for attempt in range(len(problem.constraints)):
+
+        # Ensure an area is within its positions (RG in the last half), shifting the areas in between by one
+        for bound in problem.position_bounds:
+            area_index = np.argmax(broken == bound.area, axis=1)
+            target = np.clip(area_index, bound.lower or 1, min(bound.upper or length - 2, length - 2))
+            moved = (broken == bound.area).any(axis=1) & (target != area_index)
+            if moved.any():
+                start = area_index[moved, None]
+                end = target[moved, None]
+                source = positions + ((positions >= start) & (positions < end)) - ((positions > end) & (positions <= start))
+                source = np.where(positions == end, start, source)
+                broken[moved] = np.take_along_axis(broken[moved], source, axis=1)
+
+        # Ensuring an area is not visited right after a banned one, by visiting it right before instead
+        for ban in problem.adjacency_bans:
+            qg_index = np.argmax(broken == ban.first, axis=1)
+            cs_index = np.argmax(broken == ban.second, axis=1)
+            swap = (broken == ban.first).any(axis=1) & (broken == ban.second).any(axis=1) & (cs_index == qg_index + 1)
+
+            # The depot stays at the start, so the area is visited one position later there
+            other_index = np.where(qg_index == 0, cs_index + 1, qg_index)
+            swapped = broken[rows[swap], other_index[swap]]
+            broken[rows[swap], other_index[swap]] = ban.second
+            broken[rows[swap], cs_index[swap]] = swapped
+
+        if no_constraint_batch(broken, problem).all():
+            break
+
+    routes[invalid] = fix_placeholder_batch(broken, problem)
+
+    return routes
@@ -1,74 +1,247 @@
-from base.individuals import *
+import math
+import numpy as np
+from collections import OrderedDict
+from base.individuals import calculate_route_gain, create_individuals
+from base.problem import default_problem, gain_values, problem_rules
 
-def create_population(pop_size):
+__all__ = ['create_population', 'create_population_array', 'calculate_population_gain',
+           'calculate_population_gain_batch', 'FitnessCache', 'routes_from_ranks']
+
+def create_population(pop_size, problem=None):
     """Creates a population of individuals.
 
     Args:
         population_size (int): The desired size of the population.
+        problem (Problem): The problem to draw the individuals for. Defaults to the Hollow Knight one.
 
     Returns:
         list: A list containing the created individuals.
 
     """
-    return [create_individuals() for _ in range(pop_size)]
+    return [create_individuals(problem) for _ in range(pop_size)]
 
 
+def create_population_array(pop_size, problem=None):
+    """Creates a population of individuals stored as a contiguous integer matrix.
 
-def calculate_population_gain(pop,gain_matrix):
-    """Calculates the gain for each individual in the population.
+    Each row is a route with the depot (Dirtmouth, 1) in its first and last column. The routes are
+    drawn exactly like create_population does, so the same seed gives the same population.
 
     Args:
-        population (list): A list of individuals.
-        gain_matrix (list of lists) : A matrix containing gain values used to calculate the gain for each individual
+        pop_size (int): The desired size of the population.
+        problem (Problem): The problem to draw the individuals for. Defaults to the Hollow Knight one.
 
     Returns:
-        list: A list of gain values corresponding to each individual in the population.
-
+        numpy.ndarray: A (pop_size, N + 1) matrix with one individual per row, int8 up to 127 areas.
     """
-    return [calculate_route_gain(ind,gain_matrix) for ind in pop]
-
-
-
-
-
-
-
-
-
+    dtype = (problem or default_problem()).dtype
+    return np.array([create_individuals(problem) for _ in range(pop_size)], dtype=dtype)
 
 
 
+def calculate_population_gain(pop,gain_matrix):
+    """Calculates the gain for each individual in the population.
 
+    Args:
+        population (list or numpy.ndarray): A list of individuals, or a matrix with one individual per row.
+        gain_matrix (list of lists or Problem) : A matrix containing gain values used to calculate the gain for each individual
 
+    Returns:
+        list: A list of gain values corresponding to each individual in the population.
 
+    """
+    # Populations stored as matrices are evaluated all at once
+    if isinstance(pop, np.ndarray):
+        return calculate_population_gain_batch(pop, gain_matrix)
 
+    return [calculate_route_gain(ind,gain_matrix) for ind in pop]
 
 
 
+def calculate_population_gain_batch(pop, gain_matrix):
+    """Calculates the gain of every individual in the population at once with NumPy.
 
+    Follows the same rules as calculate_route_gain: when DV directly follows QS, the route is
+    also evaluated skipping KS and the better of the two gains is kept. Individuals that end up
+    skipping KS get it replaced by the placeholder 0, just like calculate_route_gain does.
+    The areas of the skip rule come from the problem when one is given.
 
+    Args:
+        pop (list or numpy.ndarray): The population, one route per row.
+        gain_matrix (list of lists or Problem) : A matrix containing gain values used to calculate the gain for each individual
 
+    Returns:
+        numpy.ndarray: The gain values corresponding to each individual in the population.
+    """
 
+    skip = problem_rules(gain_matrix).skip_rule
+    routes = np.asarray(pop, dtype=np.intp)
+    gains = np.asarray(gain_values(gain_matrix), dtype=np.float64)
+    rows = np.arange(len(routes))
 
+    # Without a skip rule the route is just the sum of its edges
+    if skip is None:
+        edge_gains = gains[routes[:, :-1] - 1, routes[:, 1:] - 1]
+        gain_without_placeholder = np.zeros(len(routes))
+        for i in range(edge_gains.shape[1]):
+            gain_without_placeholder += edge_gains[:, i]
+        return gain_without_placeholder
 
+    has_ks = (routes == skip.skipped).any(axis=1)
+    ks_index = np.argmax(routes == skip.skipped, axis=1)
 
+    # If DV directly follows QS, replace KS with a placeholder
+    qs_dv = ((routes == skip.before).any(axis=1) & (routes == skip.after).any(axis=1)
+             & (np.argmax(routes == skip.after, axis=1) == np.argmax(routes == skip.before, axis=1) + 1))
+    areas = routes.copy()
+    areas[rows[qs_dv & has_ks], ks_index[qs_dv & has_ks]] = 0
 
+    has_placeholder = (areas == 0).any(axis=1)
+    placeholder_index = np.argmax(areas == 0, axis=1)
 
+    # Route with placeholder: the areas around it are used instead of the placeholder itself
+    skip_areas = np.where(areas == 0, np.roll(areas, 1, axis=1), areas)
+    next_areas = np.where(areas == 0, np.roll(areas, -1, axis=1), areas)
+    skip_gains = gains[skip_areas[:, :-1] - 1, next_areas[:, 1:] - 1]
 
+    # Route without placeholder: KS is placed back on it
+    areas[rows[has_placeholder], placeholder_index[has_placeholder]] = skip.skipped
+    edge_gains = gains[areas[:, :-1] - 1, areas[:, 1:] - 1]
 
+    # Add up the edges left to right, matching calculate_route_gain's summation order
+    gain_without_placeholder = np.zeros(len(routes))
+    gain_with_placeholder = np.zeros(len(routes))
+    for i in range(edge_gains.shape[1]):
+        gain_without_placeholder += edge_gains[:, i]
+        gain_with_placeholder += skip_gains[:, i]
 
+    use_placeholder = has_placeholder & (gain_with_placeholder >= gain_without_placeholder)
 
+    # Mark the skipped KS with the placeholder in the actual individuals
+    if isinstance(pop, np.ndarray):
+        pop[rows[use_placeholder & has_ks], ks_index[use_placeholder & has_ks]] = 0
+    else:
+        for i in np.flatnonzero(use_placeholder & has_ks):
+            pop[i][pop[i].index(skip.skipped)] = 0
 
+    return np.where(use_placeholder, gain_with_placeholder, gain_without_placeholder)
 
 
+class FitnessCache:
+    """Evaluator that remembers the gains of the routes it has seen, in a bounded LRU cache.
 
+    Use it in place of the evaluator given to ga, e.g. ga(create_population, data, FitnessCache(), ...):
+    routes copied forward by elitism and reproduction are then not evaluated again. Routes are
+    keyed on their tuple of areas, so a route with the placeholder 0 and the same route with KS are
+    different entries.
 
+    The routes missing from the cache are evaluated on copies, so unlike calculate_route_gain the
+    individuals are never changed in place (a skipped KS is not replaced by the placeholder).
 
+    Args:
+        evaluator (function): Evaluates a population, calculate_population_gain by default.
+        maxsize (int): Largest number of routes kept, the least recently used ones are evicted first.
+                       None for no limit.
+    """
 
+    def __init__(self, evaluator=None, maxsize=65536):
+        self.evaluator = calculate_population_gain if evaluator is None else evaluator
+        self.maxsize = maxsize
+        self.gains = OrderedDict()
+        self.gain_matrix = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, pop, gain_matrix):
+        """Calculates the gain for each individual in the population, from the cache when possible.
+
+        Args:
+            pop (list or numpy.ndarray): A list of individuals, or a matrix with one individual per row.
+            gain_matrix (list of lists or Problem): The gain matrix. The cache is cleared when it changes.
+
+        Returns:
+            list or numpy.ndarray: The gain of each individual, an array for a matrix population.
+        """
+
+        # Gains only hold for the gain matrix they were calculated with
+        if gain_matrix is not self.gain_matrix:
+            self.clear()
+            self.gain_matrix = gain_matrix
+
+        keys = [tuple(route) for route in (pop.tolist() if isinstance(pop, np.ndarray) else pop)]
+
+        # Evaluating each missing route once, on copies
+        missing = {}
+        for i, key in enumerate(keys):
+            if key in self.gains:
+                self.hits += 1
+                self.gains.move_to_end(key)
+            elif key in missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[key] = i
+
+        if missing:
+            if isinstance(pop, np.ndarray):
+                routes = pop[list(missing.values())]
+            else:
+                routes = [list(pop[i]) for i in missing.values()]
+            for key, gain in zip(missing, self.evaluator(routes, gain_matrix)):
+                self.gains[key] = gain
+
+        gains = [self.gains[key] for key in keys]
+
+        # Evicting the least recently used routes
+        while self.maxsize is not None and len(self.gains) > self.maxsize:
+            self.gains.popitem(last=False)
+            self.evictions += 1
+
+        return np.array(gains) if isinstance(pop, np.ndarray) else gains
+
+    def info(self):
+        """Returns the hits, misses, evictions and size of the cache as a dict."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.gains), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """Empties the cache and resets its counters."""
+        self.gains.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+def routes_from_ranks(ranks, problem=None):
+    """Builds the routes with the given lexicographic permutation ranks of the areas.
+
+    Rank 0 visits the areas in ascending order, [1, 2, 3, ..., N, 1] for Dirtmouth as the depot,
+    and rank (N - 1)! - 1 visits them backwards, the same order as itertools.permutations.
 
+    Args:
+        ranks (numpy.ndarray): Permutation ranks, from 0 to (N - 1)! - 1.
+        problem (Problem): The problem giving the areas and the depot. Defaults to the Hollow Knight one.
 
+    Returns:
+        numpy.ndarray: A (len(ranks), N + 1) matrix with one route per row.
+    """
+    if problem is None:
+        problem = default_problem()
 
+    n_areas = len(problem.areas)
+    ranks = np.array(ranks, dtype=np.int64)
+    routes = np.full((len(ranks), n_areas + 2), problem.depot, dtype=problem.dtype)
+    available = np.tile(np.array(problem.areas), (len(ranks), 1))
 
+    # Each factorial digit of the rank picks one of the areas not visited yet
+    for i in range(n_areas):
+        block = math.factorial(n_areas - 1 - i)
+        digit = ranks // block
+        ranks %= block
 
+        routes[:, i + 1] = available[np.arange(len(ranks)), digit]
 
+        # Removing the picked area, shifting the following ones back
+        positions = np.arange(n_areas - 1 - i)
+        available = np.take_along_axis(available, positions + (positions >= digit[:, None]), axis=1)
 
+    return routes
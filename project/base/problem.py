@@ -0,0 +1,148 @@
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+
+__all__ = ['AdjacencyBan', 'PositionBound', 'SkipRule', 'hollow_knight_constraints', 'Problem',
+           'default_problem', 'problem_rules', 'operator_problem', 'gain_values']
+
+
+# Declarative constraints of a routing problem, checked by no_constraint:
+# the area `second` cannot be visited right after the area `first`
+AdjacencyBan = namedtuple('AdjacencyBan', ['first', 'second'])
+# the area must be visited between positions `lower` and `upper` of the route (None for no bound)
+PositionBound = namedtuple('PositionBound', ['area', 'lower', 'upper'], defaults=[None, None])
+# the area `skipped` may be skipped (replaced by the placeholder 0) when `after` directly follows `before`
+SkipRule = namedtuple('SkipRule', ['skipped', 'before', 'after'])
+
+
+def hollow_knight_constraints(n_areas=10):
+    """
+    Constraints of the Hollow Knight route: CS is not visited right after QG, RG is in the last
+    half of the route and KS can be skipped when DV directly follows QS.
+
+    Args:
+        n_areas (int): Number of areas, Dirtmouth included.
+
+    Returns:
+        list: The constraints.
+    """
+
+    # Areas numbers: D - 1, FC - 2, G - 3, QS - 4, QG - 5, CS - 6, KS - 7, RG - 8, DV - 9, SN - 10
+    return [AdjacencyBan(first=5, second=6),
+            PositionBound(area=8, lower=(n_areas + 1) // 2),
+            SkipRule(skipped=7, before=4, after=9)]
+
+
+class Problem:
+    """
+    A route optimization instance: the gain matrix between the areas, the depot where the routes
+    start and end, and the constraints the routes must satisfy.
+
+    Areas are numbered from 1 to N, area i being row and column i - 1 of the gain matrix.
+    A Problem can be given to ga (and the solvers) in place of the gain matrix, and then drives
+    the initializer, the operators, the constraint checks and the evaluator.
+
+    Args:
+        gain_matrix (list of lists or numpy.ndarray): N x N matrix with the gain between each pair of areas.
+        depot (int): Area where every route starts and ends.
+        constraints (list): AdjacencyBan, PositionBound and SkipRule constraints.
+                            Defaults to the Hollow Knight constraints.
+
+    Raises:
+        ValueError: if the gain matrix is not square, the depot is not an area or there is more
+                    than one skip rule (the placeholder 0 could not tell them apart).
+    """
+
+    def __init__(self, gain_matrix, depot=1, constraints=None):
+        self.gain_matrix = np.asarray(gain_matrix, dtype=np.float64)
+        self.n_areas = len(self.gain_matrix)
+        self.depot = depot
+        self.constraints = list(hollow_knight_constraints(self.n_areas) if constraints is None else constraints)
+
+        if self.gain_matrix.shape != (self.n_areas, self.n_areas):
+            raise ValueError('The gain matrix must be square')
+        if not 1 <= depot <= self.n_areas:
+            raise ValueError(f'The depot must be an area from 1 to {self.n_areas}')
+
+        # Areas visited between leaving and coming back to the depot
+        self.areas = [area for area in range(1, self.n_areas + 1) if area != depot]
+
+        self.adjacency_bans = [rule for rule in self.constraints if isinstance(rule, AdjacencyBan)]
+        self.position_bounds = [rule for rule in self.constraints if isinstance(rule, PositionBound)]
+        skip_rules = [rule for rule in self.constraints if isinstance(rule, SkipRule)]
+        if len(skip_rules) > 1:
+            raise ValueError('Only one skip rule is supported')
+        self.skip_rule = skip_rules[0] if skip_rules else None
+
+        # Smallest integer type able to hold the areas, for routes stored as matrices
+        self.dtype = np.int8 if self.n_areas <= np.iinfo(np.int8).max else np.int16
+
+    def __repr__(self):
+        return f'Problem({self.n_areas} areas, depot={self.depot}, constraints={self.constraints})'
+
+
+@lru_cache(maxsize=None)
+def default_problem(n_areas=10):
+    """
+    The Hollow Knight rules for n_areas areas, used when no Problem is given. Only its rules are
+    meant to be used: its gain matrix is all zeros.
+
+    Args:
+        n_areas (int): Number of areas, Dirtmouth included.
+
+    Returns:
+        Problem: The problem with the default rules.
+    """
+    return Problem(np.zeros((n_areas, n_areas)))
+
+
+def problem_rules(gain_matrix):
+    """
+    Get the problem whose rules apply to a gain matrix: the Problem itself if one is given,
+    or the default Hollow Knight rules for a plain matrix.
+
+    Args:
+        gain_matrix (list of lists or Problem): The gain matrix or the problem.
+
+    Returns:
+        Problem: The problem holding the rules.
+    """
+
+    if isinstance(gain_matrix, Problem):
+        return gain_matrix
+    return default_problem(len(gain_matrix))
+
+
+def operator_problem(gain_matrix):
+    """
+    Get the problem to hand the initializer, the operators and the constraint checks of a
+    gain matrix. They default to the Hollow Knight rules for 10 areas, so a plain 10 x 10
+    matrix gets None and leaves them as they are; any other plain matrix gets the default
+    rules for its size, so its routes visit all of its areas.
+
+    Args:
+        gain_matrix (list of lists or Problem): The gain matrix or the problem.
+
+    Returns:
+        Problem or None: The problem, None for a plain 10 x 10 matrix.
+    """
+
+    if isinstance(gain_matrix, Problem) or len(gain_matrix) != default_problem().n_areas:
+        return problem_rules(gain_matrix)
+    return None
+
+
+def gain_values(gain_matrix):
+    """
+    Get the gain matrix itself, from a Problem or a plain matrix.
+
+    Args:
+        gain_matrix (list of lists or Problem): The gain matrix or the problem.
+
+    Returns:
+        list of lists or numpy.ndarray: The gain values.
+    """
+
+    if isinstance(gain_matrix, Problem):
+        return gain_matrix.gain_matrix
+    return gain_matrix
@@ -0,0 +1,359 @@
+"""
+Benchmarks the evaluators, the operators, the selectors and whole runs of ga, and writes the results
+as JSON records so that two versions of the code can be compared.
+
+Every benchmark is run on generate_geo_matrix instances for each number of areas and population size
+of the sweep, with random and numpy.random seeded again before it, so two runs time the same work.
+Instances of more than 10 areas are given as a Problem with the Hollow Knight constraints. The ga
+benchmark uses the configuration of main.py (roulette selection, cycle crossover, displacement
+mutation, 15 generations, p_xo 0.8, p_m 0.1, no elitism, seed 12).
+
+Usage: python benchmark.py [--quick] [--output results.json] [--compare old_results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from base.data import generate_geo_matrix
+from base.problem import Problem, default_problem, hollow_knight_constraints
+from base.individuals import calculate_route_gain
+from base.population import (create_population, create_population_array, calculate_population_gain,
+                             calculate_population_gain_batch)
+from operators.crossovers import BATCH_CROSSOVERS, cycle_crossover
+from operators.mutators import BATCH_MUTATORS, displacement_mutation
+from operators.selectors import SAMPLERS, roulette_selection_max, selection_function
+from algorithm.algorithm import ga
+from algorithm.utils import get_elite_max
+
+__all__ = ['BENCHMARK_SEED', 'AREA_COUNTS', 'POP_SIZES', 'benchmark_instance', 'time_rounds', 'benchmark_record',
+           'benchmark_evaluators', 'benchmark_crossovers', 'benchmark_mutators', 'benchmark_selectors',
+           'benchmark_ga', 'run_benchmarks', 'benchmark_metadata', 'compare_records']
+
+# Seed given to random and numpy.random before every benchmark
+BENCHMARK_SEED = 12
+
+# Sweep of the benchmarks, and the smaller one of --quick
+AREA_COUNTS = (10, 20, 40)
+POP_SIZES = (50, 150, 500)
+QUICK_AREA_COUNTS = (10, 20)
+QUICK_POP_SIZES = (50, 150)
+
+# Configuration of main.py, the baseline of the ga benchmark
+GA_BASELINE = {'initializer': create_population,
+               'evaluator': calculate_population_gain,
+               'selector': roulette_selection_max,
+               'crossover': cycle_crossover,
+               'mutator': displacement_mutation,
+               'n_gens': 15,
+               'p_xo': 0.8,
+               'p_m': 0.1,
+               'elite_func': get_elite_max,
+               'elitism': False,
+               'seed': 12}
+
+
+def seed_all(seed=BENCHMARK_SEED):
+    """Seeds random and numpy.random."""
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def benchmark_instance(n_areas):
+    """
+    Generates the instance of a number of areas, always the same for a given number.
+
+    Args:
+        n_areas (int): Number of areas, Dirtmouth included.
+
+    Returns:
+        Tuple[list or Problem, Problem or None]: The gain matrix (a Problem above 10 areas) and the problem to
+                                                 give the operators (None for the Hollow Knight one).
+    """
+    seed_all()
+    gain_matrix = generate_geo_matrix(n_areas)
+    if n_areas == 10:
+        return gain_matrix, None
+    problem = Problem(gain_matrix, constraints=hollow_knight_constraints(n_areas))
+    return problem, problem
+
+
+def time_rounds(run, setup=None, rounds=5):
+    """
+    Times several rounds of a benchmark, random and numpy.random being seeded before the first one.
+
+    Args:
+        run (function): Runs one round, given what setup returned (nothing without setup).
+        setup (function): Prepares the input of each round, untimed (e.g. a copy of what run modifies).
+        rounds (int): Number of rounds timed.
+
+    Returns:
+        List[float]: Time of each round, in seconds.
+    """
+    seed_all()
+    times = []
+    for _ in range(rounds):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmark_record(group, name, n_areas, pop_size, calls, times):
+    """
+    Builds the record of a benchmark.
+
+    Args:
+        group (str): Group of the benchmark (evaluator, crossover, mutator, selector, sampler, ga).
+        name (str): Name of the function benchmarked.
+        n_areas (int): Number of areas of the instance.
+        pop_size (int): Population size.
+        calls (int): Number of calls of the function in each round.
+        times (List[float]): Time of each round, in seconds (see time_rounds).
+
+    Returns:
+        dict: The record, with the best and median time per call in seconds.
+    """
+    return {'group': group, 'name': name, 'n_areas': n_areas, 'pop_size': pop_size, 'calls': calls,
+            'rounds': len(times), 'best': min(times) / calls, 'median': statistics.median(times) / calls}
+
+
+def benchmark_evaluators(gain_matrix, problem, n_areas, pop_size, rounds=5):
+    """
+    Times calculate_route_gain on every individual of a population, and calculate_population_gain and
+    calculate_population_gain_batch on the whole population.
+
+    Returns:
+        List[dict]: The records (see benchmark_record).
+    """
+    seed_all()
+    population = create_population(pop_size, problem)
+    matrix = np.array(population, dtype=(problem or default_problem()).dtype)
+
+    def route_gains(routes):
+        for individual in routes:
+            calculate_route_gain(individual, gain_matrix)
+
+    # The evaluators mark the routes skipping KS in place, each round gets its own copy of the same routes
+    def copy_population():
+        return [individual.copy() for individual in population]
+
+    return [benchmark_record('evaluator', 'calculate_route_gain', n_areas, pop_size, pop_size,
+                             time_rounds(route_gains, setup=copy_population, rounds=rounds)),
+            benchmark_record('evaluator', 'calculate_population_gain', n_areas, pop_size, 1,
+                             time_rounds(lambda routes: calculate_population_gain(routes, gain_matrix),
+                                         setup=copy_population, rounds=rounds)),
+            benchmark_record('evaluator', 'calculate_population_gain_batch', n_areas, pop_size, 1,
+                             time_rounds(lambda routes: calculate_population_gain_batch(routes, gain_matrix),
+                                         setup=matrix.copy, rounds=rounds))]
+
+
+def benchmark_crossovers(gain_matrix, problem, n_areas, pop_size, rounds=5):
+    """
+    Times each crossover on pop_size / 2 pairs of parents, one pair per call, and its batch
+    counterpart on all the pairs at once.
+
+    Returns:
+        List[dict]: The records (see benchmark_record).
+    """
+    seed_all()
+    population = create_population(pop_size - pop_size % 2, problem)
+    pairs = list(zip(population[::2], population[1::2]))
+    parents = np.array(pairs, dtype=(problem or default_problem()).dtype)
+
+    records = []
+    for crossover, crossover_batch in BATCH_CROSSOVERS.items():
+        def cross_pairs():
+            for individual1, individual2 in pairs:
+                crossover(individual1, individual2, problem=problem)
+
+        records.append(benchmark_record('crossover', crossover.__name__, n_areas, pop_size, len(pairs),
+                                        time_rounds(cross_pairs, rounds=rounds)))
+        records.append(benchmark_record('crossover', crossover_batch.__name__, n_areas, pop_size, 1,
+                                        time_rounds(lambda: crossover_batch(parents, problem=problem), rounds=rounds)))
+    return records
+
+
+def benchmark_mutators(gain_matrix, problem, n_areas, pop_size, rounds=5):
+    """
+    Times each mutator on every individual of a population, one per call, and its batch counterpart
+    on the whole population at once. The probability of mutation is 1 so that every call mutates.
+
+    Returns:
+        List[dict]: The records (see benchmark_record).
+    """
+    seed_all()
+    population = create_population(pop_size, problem)
+    matrix = np.array(population, dtype=(problem or default_problem()).dtype)
+
+    records = []
+    for mutator, mutator_batch in BATCH_MUTATORS.items():
+        def mutate_population():
+            for individual in population:
+                mutator(individual, 1, problem=problem)
+
+        records.append(benchmark_record('mutator', mutator.__name__, n_areas, pop_size, pop_size,
+                                        time_rounds(mutate_population, rounds=rounds)))
+        # The batch mutators work in place, each round gets its own copy of the population
+        records.append(benchmark_record('mutator', mutator_batch.__name__, n_areas, pop_size, 1,
+                                        time_rounds(lambda routes: mutator_batch(routes, 1, problem=problem),
+                                                    setup=matrix.copy, rounds=rounds)))
+    return records
+
+
+def benchmark_selectors(gain_matrix, problem, n_areas, pop_size, rounds=5):
+    """
+    Times each selector of SAMPLERS drawing pop_size parents, one per call, and the same draws through
+    selection_function, whose sampler is built once per round as ga does once per generation.
+
+    Returns:
+        List[dict]: The records (see benchmark_record).
+    """
+    seed_all()
+    population = create_population(pop_size, problem)
+    fitnesses = calculate_population_gain(population, gain_matrix)
+
+    records = []
+    for selector in SAMPLERS:
+        def select_parents():
+            for _ in range(pop_size):
+                selector(population, fitnesses)
+
+        def sample_parents():
+            draw = selection_function(selector, population, fitnesses)
+            for _ in range(pop_size):
+                draw()
+
+        records.append(benchmark_record('selector', selector.__name__, n_areas, pop_size, pop_size,
+                                        time_rounds(select_parents, rounds=rounds)))
+        records.append(benchmark_record('sampler', selector.__name__, n_areas, pop_size, pop_size,
+                                        time_rounds(sample_parents, rounds=rounds)))
+    return records
+
+
+def benchmark_ga(gain_matrix, problem, n_areas, pop_size, rounds=3):
+    """
+    Times whole runs of ga with the configuration of main.py (GA_BASELINE), and the same runs with the
+    population stored as a matrix (create_population_array).
+
+    Returns:
+        List[dict]: The records (see benchmark_record), one call being one run.
+    """
+    def run(**params):
+        ga(gain_matrix=gain_matrix, pop_size=pop_size, fit_plot=False, **dict(GA_BASELINE, **params))
+
+    return [benchmark_record('ga', 'ga', n_areas, pop_size, 1, time_rounds(run, rounds=rounds)),
+            benchmark_record('ga', 'ga_array', n_areas, pop_size, 1,
+                             time_rounds(lambda: run(initializer=create_population_array), rounds=rounds))]
+
+
+def run_benchmarks(area_counts=AREA_COUNTS, pop_sizes=POP_SIZES, rounds=5, ga_rounds=3, verbose=False):
+    """
+    Runs every benchmark for each number of areas and population size.
+
+    Args:
+        area_counts (Iterable[int]): Numbers of areas of the instances.
+        pop_sizes (Iterable[int]): Population sizes.
+        rounds (int): Number of rounds of the evaluator, operator and selector benchmarks.
+        ga_rounds (int): Number of runs of ga timed.
+        verbose (bool): If True, print each record as it is measured.
+
+    Returns:
+        List[dict]: The records (see benchmark_record).
+    """
+    records = []
+    for n_areas in area_counts:
+        gain_matrix, problem = benchmark_instance(n_areas)
+        for pop_size in pop_sizes:
+            for benchmark in (benchmark_evaluators, benchmark_crossovers, benchmark_mutators, benchmark_selectors):
+                for record in benchmark(gain_matrix, problem, n_areas, pop_size, rounds):
+                    records.append(record)
+                    if verbose:
+                        print_record(record)
+            for record in benchmark_ga(gain_matrix, problem, n_areas, pop_size, ga_rounds):
+                records.append(record)
+                if verbose:
+                    print_record(record)
+    return records
+
+
+def benchmark_metadata():
+    """
+    Describes the machine and the code the benchmarks ran on.
+
+    Returns:
+        dict: Python and NumPy versions, platform, time of the run and git commit (None outside a repository).
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit}
+
+
+def record_key(record):
+    """Identifies a benchmark across runs."""
+    return record['group'], record['name'], record['n_areas'], record['pop_size']
+
+
+def print_record(record):
+    """Prints a record on one line, times in microseconds per call."""
+    print(f'{record["group"]:<10}{record["name"]:<34}{record["n_areas"]:>6}{record["pop_size"]:>6}'
+          f'{record["best"] * 1e6:>14.1f}{record["median"] * 1e6:>14.1f}')
+
+
+def compare_records(records, old_records):
+    """
+    Compares the median times of two runs of the benchmarks.
+
+    Args:
+        records (List[dict]): Records of the new run.
+        old_records (List[dict]): Records of the old run.
+
+    Returns:
+        List[Tuple[tuple, float, float, float]]: For every benchmark in both runs, its key
+                                                 (group, name, n_areas, pop_size), the old and new median
+                                                 times per call and the ratio new / old (below 1 is faster).
+    """
+    old = {record_key(record): record['median'] for record in old_records}
+    return [(record_key(record), old[record_key(record)], record['median'],
+             record['median'] / old[record_key(record)])
+            for record in records if record_key(record) in old and old[record_key(record)] > 0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the evaluators, operators, selectors and ga.')
+    parser.add_argument('--quick', action='store_true', help='smaller sweep and fewer rounds')
+    parser.add_argument('--output', default='benchmark.json', help='file the results are written to')
+    parser.add_argument('--compare', metavar='OLD', help='results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    print(f'{"group":<10}{"name":<34}{"areas":>6}{"pop":>6}{"best (us)":>14}{"median (us)":>14}')
+    if args.quick:
+        records = run_benchmarks(QUICK_AREA_COUNTS, QUICK_POP_SIZES, rounds=3, ga_rounds=1, verbose=True)
+    else:
+        records = run_benchmarks(verbose=True)
+
+    with open(args.output, 'w') as file:
+        json.dump({'metadata': benchmark_metadata(), 'records': records}, file, indent=1)
+    print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            old_records = json.load(file)['records']
+        comparison = compare_records(records, old_records)
+        if not comparison:
+            sys.exit(f'No benchmark in common with {args.compare}')
+
+        print(f'\n{"group":<10}{"name":<34}{"areas":>6}{"pop":>6}{"old (us)":>14}{"new (us)":>14}{"ratio":>8}')
+        for (group, name, n_areas, pop_size), old_time, new_time, ratio in comparison:
+            print(f'{group:<10}{name:<34}{n_areas:>6}{pop_size:>6}{old_time * 1e6:>14.1f}{new_time * 1e6:>14.1f}'
+                  f'{ratio:>8.2f}')
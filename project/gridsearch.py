@@ -1,93 +1,658 @@
-from base.individuals import *
-from base.population import *
-from base.data import *
-from operators.selectors import *
-from operators.mutators import *
-from operators.crossovers import *
-from algorithm.algorithm import *
-import random
 import time
-import csv
 import numpy as np
-from copy import deepcopy
-import matplotlib.pyplot as plt
-from typing import *
-import time
-import multiprocessing
-from itertools import product
+from itertools import chain, product
 import statistics as stat
-import gc
+import hashlib
+import inspect
+import json
+import math
+from collections import namedtuple
+from contextlib import contextmanager
+from base.data import generate_geo_matrix
+from base.problem import Problem, gain_values
+from base.population import create_population, create_population_array, calculate_population_gain, calculate_population_gain_batch
+from operators.selectors import (roulette_selection_max, ranking_selection_max, tournament_selection_max,
+                                 exponential_rank_selection, linear_rank_selection)
+from operators.crossovers import cycle_crossover, pmx_crossover, ox1_crossover, uniform_crossover
+from operators.mutators import swap_mutation, inversion_mutation, scramble_mutation, insertion_mutation, displacement_mutation
+from algorithm.algorithm import ga, island_ga, steady_state_ga, held_karp
+from algorithm.utils import get_elite_max
+
+__all__ = ['run_algorithm', 'Registered', 'LoadedMatrix', 'SharedMatrix', 'LIST_MATRIX_MAX_AREAS', 'REGISTRY', 'register',
+           'share_gain_matrix', 'attach_gain_matrix', 'worker_pool', 'run_seeds', 'task_cost', 'accepts_seed',
+           'combination_tasks', 'matrix_digest', 'task_key', 'open_result_store', 'grid_search', 'successive_halving']
 
 
 def run_algorithm(args):
     algorithm, params = args
     start_time = time.time()
-    best_ind,best_fit = algorithm(**params)
+    best_ind, best_fit, *report = algorithm(**params)
     end_time = time.time()
     run_time = end_time - start_time
-    return best_fit, run_time
+    # Algorithms may return a report on the run last (e.g. ga with return_report)
+    report = report[-1] if report and isinstance(report[-1], dict) else None
+    return best_fit, run_time, report
+
+
+# Placeholders in the task parameters for a registered function and for a gain matrix loaded by the workers
+Registered = namedtuple('Registered', ['name'])
+LoadedMatrix = namedtuple('LoadedMatrix', ['index'])
+
+# Gain matrix copied in shared memory: the name of the block, the matrix shape, and the depot and constraints of a Problem
+SharedMatrix = namedtuple('SharedMatrix', ['name', 'shape', 'problem'])
+
+# Up to this many areas, workers index plain gain matrices as nested lists (see attach_gain_matrix)
+LIST_MATRIX_MAX_AREAS = 256
+
+# Gain matrices of the grid, loaded once in each worker process by init_worker, and their shared memory blocks
+worker_gain_matrices = []
+worker_shared_blocks = []
+
+
+# Functions sent to the workers by name, so the tasks don't carry pickled functions
+REGISTRY = {function.__name__: function for function in [
+    ga, island_ga, steady_state_ga, held_karp, create_population, create_population_array,
+    calculate_population_gain, calculate_population_gain_batch,
+    roulette_selection_max, ranking_selection_max, tournament_selection_max,
+    exponential_rank_selection, linear_rank_selection,
+    cycle_crossover, pmx_crossover, ox1_crossover, uniform_crossover,
+    swap_mutation, inversion_mutation, scramble_mutation, insertion_mutation, displacement_mutation,
+    get_elite_max]}
+
+
+def register(function, name=None):
+    """
+    Add a function to the registry, so grid_search sends it to the workers by name.
+    Can be used as a decorator.
+
+    Args:
+        function (Callable): The function (algorithm, initializer, evaluator, operator...).
+        name (str): The name to register it with, the name of the function by default.
+
+    Returns:
+        Callable: The same function.
+    """
+    REGISTRY[name or function.__name__] = function
+    return function
+
+
+def share_gain_matrix(gain_matrix):
+    """
+    Copy a gain matrix, or the one of a Problem, into shared memory as a float64 array.
+
+    Args:
+        gain_matrix (list of lists, numpy.ndarray or Problem): The gain matrix.
+
+    Returns:
+        tuple: (the shared memory block, to close and unlink once the workers are done,
+                the SharedMatrix to attach it with attach_gain_matrix)
+    """
+    problem = (gain_matrix.depot, gain_matrix.constraints) if isinstance(gain_matrix, Problem) else None
+    values = np.asarray(gain_values(gain_matrix), dtype=np.float64)
+
+    # Only loaded when the runs go to a pool, like multiprocessing in worker_pool
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=np.float64, buffer=block.buf)[:] = values
+
+    return block, SharedMatrix(block.name, values.shape, problem)
+
+
+def attach_gain_matrix(shared):
+    """
+    Attach, read-only, a gain matrix copied in shared memory by share_gain_matrix.
+
+    Small plain matrices (up to LIST_MATRIX_MAX_AREAS areas) are copied into nested lists, because
+    calculate_population_gain adds up list routes edge by edge, and NumPy indexing costs more than
+    the edges it saves on them: 500 routes take 2.3 ms against 5.5 ms on 10 areas, 26.8 ms against
+    30.4 ms on 256. The copy is made once per worker (2.8 ms and about 2.6 MB on 256 areas, against
+    0.5 MB shared). Larger matrices, and those of a Problem, are used in place, saving that copy.
+
+    Args:
+        shared (SharedMatrix): The shared matrix.
+
+    Returns:
+        tuple: (the shared memory block, to keep open while the matrix is used, the gain matrix or Problem)
+    """
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(name=shared.name)
+    values = np.ndarray(shared.shape, dtype=np.float64, buffer=block.buf)
+    values.flags.writeable = False
+
+    if shared.problem is not None:
+        return block, Problem(values, *shared.problem)
+    if len(values) <= LIST_MATRIX_MAX_AREAS:
+        return block, values.tolist()
+    return block, values
+
+
+def init_worker(gain_matrices):
+    """
+    Initialize a worker process of grid_search, attaching the gain matrices the tasks refer to.
+
+    Args:
+        gain_matrices (List[SharedMatrix]): The gain matrices of the grid, in shared memory.
+    """
+    global worker_gain_matrices, worker_shared_blocks
+    worker_shared_blocks, worker_gain_matrices = zip(*map(attach_gain_matrix, gain_matrices)) if gain_matrices else ((), ())
+
+
+def pack_task(task, gain_matrices):
+    """
+    Shrink a task before sending it to a worker: registered functions are replaced by their name
+    and gain matrices by their index in gain_matrices.
+
+    Args:
+        task (tuple): (combination index, run index, (algorithm, params)).
+        gain_matrices (List[Any]): The gain matrices given to init_worker.
+
+    Returns:
+        tuple: The task with the placeholders.
+    """
+    comb_index, run_index, (algorithm, params) = task
+    names = {function: name for name, function in REGISTRY.items()}
+
+    def pack(key, value):
+        if key == 'gain_matrix':
+            for index, matrix in enumerate(gain_matrices):
+                if matrix is value:
+                    return LoadedMatrix(index)
+        if callable(value) and getattr(value, '__hash__', None) is not None and value in names:
+            return Registered(names[value])
+        return value
+
+    return comb_index, run_index, (pack(None, algorithm), {key: pack(key, value) for key, value in params.items()})
+
+
+def unpack_value(value):
+    """
+    Get back the function or gain matrix behind a placeholder of pack_task, in a worker.
+
+    Args:
+        value (Any): A parameter value, possibly a placeholder.
+
+    Returns:
+        Any: The parameter value.
+    """
+    if isinstance(value, Registered):
+        return REGISTRY[value.name]
+    if isinstance(value, LoadedMatrix):
+        return worker_gain_matrices[value.index]
+    return value
+
+
+def run_task(task):
+    """
+    Run one (combination, run) task of grid_search, packed by pack_task.
+
+    Args:
+        task (tuple): (combination index, run index, (algorithm, params)).
+
+    Returns:
+        tuple: (combination index, run index, best fitness, run time, report of the algorithm or None).
+    """
+    comb_index, run_index, (algorithm, params) = task
+    args = (unpack_value(algorithm), {key: unpack_value(value) for key, value in params.items()})
+    return (comb_index, run_index) + run_algorithm(args)
+
+
+@contextmanager
+def worker_pool(n_processes, params_dict):
+    """
+    Create the process pool of grid_search. The gain matrices of the grid are copied once into shared
+    memory, attached by every worker, and released when the pool is done.
+
+    Args:
+        n_processes (int): Number of worker processes, the number of CPU cores if None.
+        params_dict (Dict[str, List[Any]]): The parameter grid.
+
+    Yields:
+        tuple: (the pool, the gain matrices to pack the tasks with)
+    """
+    # Only loaded when a pool is created
+    import multiprocessing
+
+    gain_matrices = list(params_dict.get('gain_matrix', []))
+    blocks, shared = zip(*map(share_gain_matrix, gain_matrices)) if gain_matrices else ((), ())
+
+    try:
+        with multiprocessing.Pool(processes=n_processes or multiprocessing.cpu_count(),
+                                  initializer=init_worker, initargs=(list(shared),)) as pool:
+            yield pool, gain_matrices
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def run_seeds(seed, n_runs):
+    """
+    Derive independent seeds for the runs of a combination from its seed, with numpy's SeedSequence.
+
+    The same seed always gives the same run seeds, so any run can be replayed by calling the
+    algorithm with its run seed.
+
+    Args:
+        seed (int): The seed of the combination.
+        n_runs (int): The number of runs.
+
+    Returns:
+        List[int]: One 32 bit seed per run.
+    """
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n_runs)]
+
+
+def task_cost(params):
+    """
+    Estimate the relative cost of running a parameter combination, used to schedule the largest runs first.
+
+    Args:
+        params (Dict[str, Any]): The parameters of the combination.
+
+    Returns:
+        int: The number of individuals bred over the run (pop_size * n_gens, 1 when not given).
+    """
+    return params.get('pop_size', 1) * params.get('n_gens', 1)
+
+
+def accepts_seed(algorithm):
+    """
+    Check whether an algorithm takes a seed, passed as the 'seed' keyword argument.
+
+    Args:
+        algorithm (Callable): The algorithm function.
+
+    Returns:
+        bool: True if the algorithm has a 'seed' parameter or takes any keyword argument.
+    """
+    parameters = inspect.signature(algorithm).parameters.values()
+    return any(parameter.name == 'seed' or parameter.kind is parameter.VAR_KEYWORD for parameter in parameters)
+
+
+def combination_tasks(comb, algorithm, params, n_runs, seed_runs=True):
+    """
+    Build the tasks running a parameter combination n_runs times, each with its seed (see grid_search).
+
+    Args:
+        comb (int): The index of the combination.
+        algorithm (Callable): The algorithm function.
+        params (Dict[str, Any]): The parameters of the combination.
+        n_runs (int): The number of runs.
+        seed_runs (bool): If True, each run uses its own seed from run_seeds. If False, a combination
+                          with a 'seed' is run only once.
+
+    Returns:
+        List[tuple]: The (combination index, run index, (algorithm, params)) tasks. Algorithms without
+                     a seed parameter (e.g. held_karp) are deterministic, and are run only once.
+    """
+    if not accepts_seed(algorithm):
+        return [(comb, 0, (algorithm, params))]
+
+    if seed_runs:
+        return [(comb, run, (algorithm, {**params, 'seed': seed})) for run, seed in enumerate(run_seeds(params.get('seed', 0), n_runs))]
+
+    # Runs with the same seed are identical, only one is needed
+    if 'seed' in params:
+        return [(comb, 0, (algorithm, params))]
+
+    return [(comb, run, (algorithm, params)) for run in range(n_runs)]
 
 
-def grid_search(algorithm, n_runs, params_dict):
+def json_value(value):
+    """
+    Convert the NumPy values of a report (e.g. the history of a ga run) for the result store. Arrays keep
+    their dtype and shape, so that stored_value gives them back as they were.
+
+    Args:
+        value (numpy.ndarray or numpy.generic): The value json cannot serialize.
+
+    Returns:
+        Any: The value as Python lists and numbers.
+    """
+    if isinstance(value, np.ndarray):
+        return {'ndarray': value.ravel().tolist(), 'dtype': str(value.dtype), 'shape': list(value.shape)}
+    return value.tolist()
+
+
+def stored_value(value):
+    """
+    Turn the arrays of a report read from the result store back into NumPy arrays (see json_value),
+    so a resumed search returns the same results as an uninterrupted one.
+
+    Args:
+        value (dict): An object decoded by json.
+
+    Returns:
+        Any: The array the object stands for, or the object itself.
+    """
+    if set(value) == {'ndarray', 'dtype', 'shape'}:
+        return np.array(value['ndarray'], dtype=value['dtype']).reshape(value['shape'])
+    return value
+
+
+def run_record(seed, fit, run_time, report):
+    """
+    Describe one run in the results of grid_search.
+
+    Args:
+        seed (int): Seed of the run.
+        fit (float): Best fitness of the run.
+        run_time (float): Run time of the run.
+        report (dict): Report of the algorithm on the run, if it returned one.
+
+    Returns:
+        Dict[str, Any]: The seed, fitness and time of the run, and the report if any.
+    """
+    record = {'seed': seed, 'fit': fit, 'time': run_time}
+    if report is not None:
+        record['report'] = report
+    return record
+
+
+def best_results(model_parameters, records):
+    """
+    Build the results of grid_search from the runs of the best combination.
+
+    Args:
+        model_parameters (Dict[str, Any]): Parameters of the best combination.
+        records (List[Dict[str, Any]]): Its runs, see run_record.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The parameters, average time and fitness and the runs of the combination,
+                                   and the average number of generations run when all the runs report it.
+    """
+    results = {'model_parameters': model_parameters,
+               'time': stat.mean(record['time'] for record in records),
+               'avg_fit': stat.mean(record['fit'] for record in records),
+               'runs': records}
+
+    # Runs stopped early (see ga) count the generations they actually ran
+    if all('n_gens' in record.get('report', {}) for record in records):
+        results['avg_gens'] = stat.mean(record['report']['n_gens'] for record in records)
+
+    return {'best_fit': results}
+
+
+def stable_repr(value):
+    """
+    Build a representation of a parameter value that does not change between processes or sessions,
+    naming functions by their module and name and listing the content of matrices and objects.
+
+    Args:
+        value (Any): The parameter value.
+
+    Returns:
+        Any: A JSON serializable representation of the value.
+    """
+    if isinstance(value, dict):
+        return {str(key): stable_repr(item) for key, item in sorted(value.items(), key=lambda item: str(item[0]))}
+    if hasattr(value, '_fields'):
+        return [type(value).__name__, [stable_repr(item) for item in value]]
+    if isinstance(value, (list, tuple)):
+        return [stable_repr(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, '__qualname__'):
+        return f'{value.__module__}.{value.__qualname__}'
+    if hasattr(value, '__dict__'):
+        return [type(value).__name__, stable_repr(vars(value))]
+    return repr(value)
+
+
+def matrix_digest(gain_matrix):
+    """
+    Hash the content of a gain matrix, and the depot and constraints of a Problem, for task_key.
+
+    Args:
+        gain_matrix (list of lists or Problem): The gain matrix.
+
+    Returns:
+        str: The SHA-256 hex digest of the matrix.
+    """
+    values = np.ascontiguousarray(gain_values(gain_matrix), dtype=np.float64)
+    digest = hashlib.sha256(values.tobytes())
+    digest.update(json.dumps([values.shape, stable_repr(gain_matrix.depot), stable_repr(gain_matrix.constraints)]
+                             if isinstance(gain_matrix, Problem) else [values.shape]).encode())
+    return digest.hexdigest()
+
+
+def task_key(params, run, matrix_digests=None):
+    """
+    Hash a run of a parameter combination into the key its result is stored with.
+
+    Args:
+        params (Dict[str, Any]): The parameters of the run.
+        run (int): The index of the run in its combination.
+        matrix_digests (Dict[int, str]): The digest of each gain matrix of the grid (see matrix_digest), by id,
+                                         so that every task does not hash the whole matrix again.
+
+    Returns:
+        str: The SHA-256 hex digest of the parameters and the run index.
+    """
+    if 'gain_matrix' in params:
+        digest = (matrix_digests or {}).get(id(params['gain_matrix'])) or matrix_digest(params['gain_matrix'])
+        params = {**params, 'gain_matrix': digest}
+    text = json.dumps({'params': stable_repr(params), 'run': run}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def open_result_store(path):
+    """
+    Open (or create) the SQLite file where grid_search saves the result of each finished run.
+
+    Args:
+        path (str): Path to the SQLite file.
+
+    Returns:
+        sqlite3.Connection: The connection to the store.
+    """
+    # Only loaded when the runs are stored
+    import sqlite3
+
+    store = sqlite3.connect(path)
+    store.execute('CREATE TABLE IF NOT EXISTS runs (key TEXT PRIMARY KEY, best_fit REAL, run_time REAL, report TEXT)')
+    # Stores created before the reports were kept
+    if 'report' not in [column[1] for column in store.execute('PRAGMA table_info(runs)')]:
+        store.execute('ALTER TABLE runs ADD COLUMN report TEXT')
+    store.commit()
+    return store
+
+
+def grid_search(algorithm, n_runs, params_dict, n_processes=None, seed_runs=True, store_path=None):
     """
     Perform a grid search over a given algorithm with different combinations of parameters.
 
+    Every run of every combination is submitted to the pool up front, the most expensive ones first
+    (see task_cost), and the results are aggregated as they come back, so the workers are never left
+    waiting for the slowest run of a combination.
+
+    Each run gets its own seed, derived from the 'seed' of the combination (0 if not given) by run_seeds,
+    so the runs are independent repeats and the seeds of the best combination are returned with its results.
+    With seed_runs=False every run keeps the given seed: being identical, a combination is then run only once.
+
+    Tasks carry registered functions by name and the gain matrices are shared with the workers (see pack_task and worker_pool).
+
+    With a store_path, each finished run is saved to a SQLite file under a hash of its parameters (task_key),
+    and the runs already saved are not run again, so an interrupted search can be resumed with the same call.
+    The key covers the content of the gain matrix, which must then be the same on restart.
+
     Args:
         algorithm (Callable): The algorithm function.
         n_runs (int): The number of times to run the algorithm for each parameter combination.
         params_dict (Dict[str, List[Any]]): A dictionary with parameter names as keys and a list of values for each parameter.
+        n_processes (int): Number of worker processes, the number of CPU cores by default.
+        seed_runs (bool): If True, each run uses its own seed, passed to the algorithm as 'seed'.
+                          If False, the runs of a combination with a 'seed' are deduplicated.
+        store_path (str): Path to a SQLite file keeping the results of the finished runs (see open_result_store).
 
     Returns:
-        Dict[str, Dict[str, Any]]: A dictionary containing the best performing combinations and their metrics.
+        Dict[str, Dict[str, Any]]: A dictionary containing the best performing combinations and their metrics,
+                                   and the seed, fitness and time of each of its runs.
     """
 
-    # Creates a multiprocessing Pool with a number of processes equal to the number of CPU cores available on the computer
-    pool = multiprocessing.Pool(processes=multiprocessing.cpu_count())
-
     # Creating combinations
-    keys = params_dict.keys()
+    param_names = params_dict.keys()
     values = params_dict.values()
     combinations = list(product(*values))
 
+    # Dictionary for each combination
+    model_combinations = [dict(zip(param_names, combination)) for combination in combinations]
+
     # Lists to store metrics
-    model_combinations = []
-    avg_runtime = []
-    avg_fit = []
+    avg_fit = [None] * len(combinations)
+    runs = [None] * len(combinations)
+
+    # Every run of every combination with its seed, the largest first
+    tasks = [task for comb, params in enumerate(model_combinations) for task in combination_tasks(comb, algorithm, params, n_runs, seed_runs)]
+    tasks.sort(key=lambda task: task_cost(task[2][1]), reverse=True)
+    seeds = {(comb, run): args[1].get('seed') for comb, run, args in tasks}
+    n_tasks = [0] * len(combinations)
+    for comb, run, args in tasks:
+        n_tasks[comb] += 1
+
+    # Runs of the combinations still running
+    finished_runs = {}
+
+    # Results of the runs finished in earlier sessions
+    store = None
+    stored = []
+    if store_path is not None:
+        store = open_result_store(store_path)
+        saved_runs = {key: (best_fit, run_time, None if report is None else json.loads(report, object_hook=stored_value))
+                      for key, best_fit, run_time, report in store.execute('SELECT key, best_fit, run_time, report FROM runs')}
+        # Each gain matrix of the grid is hashed once, the keys only carry its digest
+        matrix_digests = {id(matrix): matrix_digest(matrix) for matrix in params_dict.get('gain_matrix', [])}
+        run_keys = {(comb, run): task_key(args[1], run, matrix_digests) for comb, run, args in tasks}
+        stored = [(comb, run) + saved_runs[run_keys[comb, run]] for comb, run, args in tasks if run_keys[comb, run] in saved_runs]
+        tasks = [task for task in tasks if run_keys[task[0], task[1]] not in saved_runs]
+    restored = {(comb, run) for comb, run, *result in stored}
 
     print(f"With the parameters chosen, there will be {len(combinations)} combinations tested...\nStart:")
+    if stored:
+        print(f'{len(stored)} runs restored from {store_path}.')
+
+    # Creates a multiprocessing Pool with a number of processes equal to the number of CPU cores available on the computer
+    with worker_pool(n_processes, params_dict) as (pool, gain_matrices):
+
+        done = 0
+        packed_tasks = (pack_task(task, gain_matrices) for task in tasks)
+        for comb, run, best_fit, run_time, report in chain(stored, pool.imap_unordered(run_task, packed_tasks)):
+            finished_runs.setdefault(comb, []).append((run, best_fit, run_time, report))
+
+            # Saving the run as soon as it is back
+            if store is not None and (comb, run) not in restored:
+                store.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)',
+                              (run_keys[comb, run], float(best_fit), run_time, None if report is None else json.dumps(report, default=json_value)))
+                store.commit()
 
-    comb = 0
-    for combination in combinations:
-        
-        # Dictionary for the combination running
-        params = dict(zip(keys, combination))
-        model_combinations.append(params)
-
-        # Lists for metrics of each iteration
-        final_fits = []
-        run_times = []
-        
-        # Finding combinations with the best metrics
-        results = pool.map(run_algorithm, [(algorithm, params)] * n_runs)
-        final_fits, run_times = zip(*results)
-
-        avg_runtime.append(stat.mean(run_times))
-        avg_fit.append(stat.mean(final_fits))
-       
-        comb += 1
-        if comb % 5 == 0:
-            print(f'{len(combinations) - comb} combinations left.')
+            # Aggregating a combination as soon as all its runs are back
+            if len(finished_runs[comb]) == n_tasks[comb]:
+                comb_runs = sorted(finished_runs.pop(comb))
 
+                # A deduplicated run stands for all the runs of its combination
+                if n_tasks[comb] < n_runs:
+                    comb_runs = comb_runs * n_runs
+
+                runs[comb] = [run_record(seeds[comb, run], *result) for run, *result in comb_runs]
+                avg_fit[comb] = stat.mean(record['fit'] for record in runs[comb])
+
+                done += 1
+                if done % 5 == 0:
+                    print(f'{len(combinations) - done} combinations left.')
+
+
+    if store is not None:
+        store.close()
 
     print('End!\nDone :)) Here are your final results:')
 
-    fittest = model_combinations[avg_fit.index(max(avg_fit))]
+    fittest = avg_fit.index(max(avg_fit))
+
+    return best_results(model_combinations[fittest], runs[fittest])
+
+
+
+
+def successive_halving(algorithm, n_runs, params_dict, eta=3, min_fraction=1/9, n_processes=None, seed_runs=True):
+    """
+    Tune the parameters of an algorithm with successive halving, a budget aware alternative to grid_search.
+
+    All the combinations first get a small budget: a fraction of their generations ('n_gens') and of
+    the runs. Only the best 1/eta of them are promoted to a budget eta times larger, until the last round
+    runs the remaining combinations with their full n_gens and n_runs, like grid_search. Every round uses
+    the same process pool, and the runs use the same seeds as in grid_search.
+
+    Args:
+        algorithm (Callable): The algorithm function.
+        n_runs (int): The number of times to run the algorithm for each parameter combination in the last round.
+        params_dict (Dict[str, List[Any]]): A dictionary with parameter names as keys and a list of values for each parameter.
+        eta (int): The budget grows by eta between rounds, and 1/eta of the combinations are promoted.
+        min_fraction (float): The budget of the first round, as a fraction of the full budget.
+        n_processes (int): Number of worker processes, the number of CPU cores by default.
+        seed_runs (bool): If True, each run uses its own seed, see grid_search.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: A dictionary containing the best performing combinations and their metrics,
+                                   in the same format as grid_search.
+    """
+
+    # Creating combinations
+    keys = params_dict.keys()
+    values = params_dict.values()
+    model_combinations = [dict(zip(keys, combination)) for combination in product(*values)]
+
+    # Rounds from the smallest budget to the full one
+    n_rounds = int(round(math.log(1 / min_fraction, eta))) + 1
+    survivors = list(range(len(model_combinations)))
+
+    print(f"With the parameters chosen, there will be {len(model_combinations)} combinations tested in {n_rounds} rounds...\nStart:")
+
+    # Creates a multiprocessing Pool with a number of processes equal to the number of CPU cores available on the computer
+    with worker_pool(n_processes, params_dict) as (pool, gain_matrices):
+
+        for round_index in range(n_rounds):
+            fraction = eta ** (round_index - n_rounds + 1)
+            round_runs = max(1, round(n_runs * fraction))
+
+            # The combinations run with a fraction of their generations
+            tasks = []
+            for comb in survivors:
+                params = dict(model_combinations[comb])
+                if 'n_gens' in params:
+                    params['n_gens'] = max(1, round(params['n_gens'] * fraction))
+                tasks.extend(combination_tasks(comb, algorithm, params, round_runs, seed_runs))
+            tasks.sort(key=lambda task: task_cost(task[2][1]), reverse=True)
+            seeds = {(comb, run): args[1].get('seed') for comb, run, args in tasks}
+
+            finished_runs = {comb: [] for comb in survivors}
+            packed_tasks = (pack_task(task, gain_matrices) for task in tasks)
+            for comb, run, best_fit, run_time, report in pool.imap_unordered(run_task, packed_tasks):
+                finished_runs[comb].append((run, best_fit, run_time, report))
+
+            avg_fit = {comb: stat.mean(fit for run, fit, run_time, report in comb_runs) for comb, comb_runs in finished_runs.items()}
+            print(f'Round {round_index + 1}: {len(survivors)} combinations with {round_runs} runs and {fraction:.3g} of the generations.')
+
+            # Promoting the best combinations, the first ones on ties
+            if round_index < n_rounds - 1:
+                survivors = sorted(survivors, key=lambda comb: -avg_fit[comb])[:max(1, len(survivors) // eta)]
+
+
+    print('End!\nDone :)) Here are your final results:')
+
+    fittest = max(survivors, key=lambda comb: (avg_fit[comb], -comb))
+    comb_runs = sorted(finished_runs[fittest])
+
+    # A deduplicated run stands for all the runs of its combination
+    if len(comb_runs) < n_runs:
+        comb_runs = comb_runs * n_runs
 
-    results = {'best_fit': {'model_parameters': fittest,
-                           'time': avg_runtime[model_combinations.index(fittest)],
-                           'avg_fit': avg_fit[model_combinations.index(fittest)]}}
-    
-    return results
+    return best_results(model_combinations[fittest], [run_record(seeds[fittest, run], *result) for run, *result in comb_runs])
 
 
 
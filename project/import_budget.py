@@ -0,0 +1,76 @@
+"""
+Measures the import time of the modules of the project and checks it against a budget.
+
+Each module is imported in a fresh interpreter with `python -X importtime`, as in a worker process
+started with the spawn method. NumPy is needed by every module and is measured on its own, the
+budgets only cover what the project adds on top of it.
+
+Usage: python import_budget.py [repeats]
+"""
+import subprocess
+import sys
+
+# Import time allowed for each module on top of NumPy, in milliseconds
+IMPORT_BUDGETS_MS = {'base.population': 10,
+                     'operators.crossovers': 10,
+                     'operators.mutators': 10,
+                     'operators.selectors': 5,
+                     'algorithm.algorithm': 20,
+                     'gridsearch': 40}
+
+
+def import_times(module):
+    """
+    Imports a module in a fresh interpreter and reads the cumulative import time of every module it loaded.
+
+    Args:
+        module (str): Name of the module to import.
+
+    Returns:
+        Dict[str, int]: Cumulative import time of each module loaded, in microseconds.
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_time, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def project_import_time(module, repeats=5):
+    """
+    Measures the time a module takes to import on top of NumPy, keeping the best of several imports.
+
+    Args:
+        module (str): Name of the module to import.
+        repeats (int): Number of imports measured.
+
+    Returns:
+        Tuple[float, float]: Import time of the module without NumPy, and of NumPy, in milliseconds.
+    """
+    best = None
+    for _ in range(repeats):
+        times = import_times(module)
+        numpy_time = times.get('numpy', 0)
+        measured = (times[module] - numpy_time) / 1000, numpy_time / 1000
+        best = measured if best is None or measured[0] < best[0] else best
+    return best
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    over_budget = []
+
+    print(f'{"module":<24}{"time (ms)":>12}{"budget":>10}{"numpy":>10}')
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        own_time, numpy_time = project_import_time(module, repeats)
+        print(f'{module:<24}{own_time:>12.1f}{budget:>10}{numpy_time:>10.1f}')
+        if own_time > budget:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f'Over budget: {", ".join(over_budget)}')
+        sys.exit(1)
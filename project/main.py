@@ -1,11 +1,10 @@
-from base.individuals import *
-from base.population import *
-from base.data import *
-from operators.selectors import *
-from operators.mutators import *
-from operators.crossovers import *
-from algorithm.algorithm import *
-from algorithm.utils import *
+from base.individuals import nums_to_initials
+from base.population import create_population, calculate_population_gain
+from operators.selectors import roulette_selection_max
+from operators.mutators import displacement_mutation
+from operators.crossovers import cycle_crossover
+from algorithm.algorithm import ga
+from algorithm.utils import get_elite_max
 
 if __name__ == '__main__':
     
@@ -0,0 +1 @@
+"""Selection, crossover and mutation operators of the genetic algorithms."""
@@ -1,7 +1,13 @@
-from base.individuals import *
+from base.individuals import fix_placeholder, fix_placeholder_batch, post_operations, pre_operations
 import random
+import numpy as np
 
-def cycle_crossover(individual1, individual2):
+__all__ = ['cycle_crossover', 'pmx_crossover', 'ox1_crossover', 'uniform_crossover',
+           'first_positions', 'crossover_batch_children', 'cycle_crossover_batch',
+           'pmx_crossover_batch', 'ox1_crossover_batch', 'uniform_crossover_batch',
+           'BATCH_CROSSOVERS']
+
+def cycle_crossover(individual1, individual2, problem=None):
     """
     Execute cycle crossover on two parent sequences to produce offspring,
     incorporating pre- and post-crossover operations.
@@ -12,6 +18,7 @@ def cycle_crossover(individual1, individual2):
     Args:
         individual1 (list): The first parent genome sequence.
         individual2 (list): The second parent genome sequence.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
 
     Returns:
         tuple: Contains two offspring created by cycle crossover.
@@ -104,17 +111,17 @@ def cycle_crossover(individual1, individual2):
     offspring2 = generate_cycle_crossover(parent2, parent1, size, start)
 
     # Apply post-operation modifications to the offspring
-    offspring1 = post_operations(offspring1)
-    offspring2 = post_operations(offspring2)
+    offspring1 = post_operations(offspring1, problem)
+    offspring2 = post_operations(offspring2, problem)
 
     # Fix placeholders in the offspring
-    offspring1 = fix_placeholder(offspring1)
-    offspring2 = fix_placeholder(offspring2)
+    offspring1 = fix_placeholder(offspring1, problem)
+    offspring2 = fix_placeholder(offspring2, problem)
 
     return (offspring1, offspring2)
 
 
-def pmx_crossover(individual1, individual2):
+def pmx_crossover(individual1, individual2, problem=None):
     """
     Executes Partially Mapped Crossover (PMX) between two individuals to produce two offsprings.
     This function involves selecting a crossover segment from one parent and filling in the remaining elements
@@ -124,10 +131,10 @@ def pmx_crossover(individual1, individual2):
 
         individual1 (list): The first individual genome or list.
         individual2 (list): The second individual genome or list.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
 
     Returns:
-        tuple: Contains two offspring generated by the PMX crossover process, 
-               after applying pre- and post-operations to modify the genome sequences.
+        tuple: Contains two offspring generated by the PMX crossover process.
     """
 
     size = len(individual1)
@@ -211,16 +218,15 @@ def pmx_crossover(individual1, individual2):
         offspring1[i] = offspring1[i] if offspring1[i] is not None else individual2[i]
         offspring2[i] = offspring2[i] if offspring2[i] is not None else individual1[i]
 
-    # Apply post-operation modifications and potential placeholder corrections to the offspring
-    offspring1 = post_operations(offspring1)
-    offspring2 = post_operations(offspring2)
-    offspring1 = fix_placeholder(offspring1)
-    offspring2 = fix_placeholder(offspring2)
+    # Apply potential placeholder corrections to the offspring
+    # (PMX works on the whole individual, so Dirtmouth is already at both ends)
+    offspring1 = fix_placeholder(offspring1, problem)
+    offspring2 = fix_placeholder(offspring2, problem)
 
     return offspring1, offspring2
 
 
-def ox1_crossover(individual1, individual2):
+def ox1_crossover(individual1, individual2, problem=None):
     """
     Execute an Order Crossover (OX1) between two individual genomes.
 
@@ -232,6 +238,7 @@ def ox1_crossover(individual1, individual2):
     Args:
         individual1 (list): The first individual genome or list.
         individual2 (list): The second individual genome or list.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
 
     Returns:
         tuple: Contains two offspring generated by the OX1 crossover process, 
@@ -279,23 +286,24 @@ def ox1_crossover(individual1, individual2):
         index = (index + 1) % size
 
      # Apply post-operation modifications and potential placeholder corrections to the offspring
-    offspring1 = post_operations(offspring1)
-    offspring2 = post_operations(offspring2)
-    offspring1 = fix_placeholder(offspring1)
-    offspring2 = fix_placeholder(offspring2)
+    offspring1 = post_operations(offspring1, problem)
+    offspring2 = post_operations(offspring2, problem)
+    offspring1 = fix_placeholder(offspring1, problem)
+    offspring2 = fix_placeholder(offspring2, problem)
 
 
     return offspring1, offspring2
 
 
 
-def uniform_crossover(individual1, individual2):
+def uniform_crossover(individual1, individual2, problem=None):
     """
     Performs Uniform Crossover between two parent individuals, incorporating pre- and post-crossover operations.
 
     Args:
         individual1 (list): The first parent individual.
         individual2 (list): The second parent individual.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
 
     Returns:
         tuple: A tuple containing two offspring individuals resulting from the Uniform Crossover operation.
@@ -321,15 +329,256 @@ def uniform_crossover(individual1, individual2):
             offspring2.append(parent1[i])
 
     # Apply post-operation modifications and potential placeholder corrections to the offspring
-    offspring1 = post_operations(offspring1)
-    offspring2 = post_operations(offspring2)
-    offspring1 = fix_placeholder(offspring1)
-    offspring2 = fix_placeholder(offspring2)
+    offspring1 = post_operations(offspring1, problem)
+    offspring2 = post_operations(offspring2, problem)
+    offspring1 = fix_placeholder(offspring1, problem)
+    offspring2 = fix_placeholder(offspring2, problem)
 
 
     return offspring1, offspring2
 
 
 
+def first_positions(parents, n_genes):
+    """
+    Build a lookup table with the first position of every gene in each parent, the batch
+    counterpart of list.index. Genes missing from a parent are marked with -1.
+
+    Args:
+        parents (numpy.ndarray): Matrix of genome sequences, one per row.
+        n_genes (int): Number of distinct gene values (the table width).
+
+    Returns:
+        numpy.ndarray: A (len(parents), n_genes) matrix of positions.
+    """
+
+    rows = np.arange(len(parents))
+    positions = np.full((len(parents), n_genes), -1, dtype=np.intp)
+
+    # Walk the columns backwards so the first occurrence of a gene is the one kept
+    for j in reversed(range(parents.shape[1])):
+        positions[rows, parents[:, j]] = j
+
+    return positions
+
+
+def crossover_batch_children(parents, make_child, inner=True, problem=None):
+    """
+    Apply a batch crossover kernel to both parent orders and assemble the offspring matrix.
+
+    Args:
+        parents (numpy.ndarray): (N, 2, route length) array with the parent pairs.
+        make_child (function): Kernel taking the (first parent, second parent) matrices and the
+                               number of gene values, returning the children keeping the first
+                               parent's material.
+        inner (bool): If True, the kernel only sees the genes between Dirtmouth (pre_operations).
+        problem (Problem): The problem giving the skip rule. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: (N, 2, route length) array with the two offspring of each pair.
+    """
+
+    genes = parents.astype(np.intp)
+    n_genes = int(parents.max(initial=0)) + 1
+    if inner:
+        genes = genes[:, :, 1:-1]
+
+    # Offspring keep Dirtmouth at both ends, like post_operations
+    offspring = parents.copy()
+    children = offspring[:, :, 1:-1] if inner else offspring
+    children[:, 0] = make_child(genes[:, 0], genes[:, 1], n_genes)
+    children[:, 1] = make_child(genes[:, 1], genes[:, 0], n_genes)
+
+    # Fix placeholders in the offspring
+    fix_placeholder_batch(offspring.reshape(-1, offspring.shape[-1]), problem)
+
+    return offspring
+
+
+def cycle_crossover_batch(parents, problem=None):
+    """
+    Batch version of cycle_crossover: all parent pairs are crossed in one vectorized call.
+
+    The cycles of every pair are followed together, one step per iteration, using a lookup
+    table of gene positions instead of searching the parents.
+
+    Args:
+        parents (numpy.ndarray): (N, 2, route length) array with the parent pairs.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: (N, 2, route length) array with the two offspring of each pair.
+    """
+
+    def cycle_child(parent1, parent2, n_genes):
+        n, size = parent1.shape
+        rows = np.arange(n)
+        positions = first_positions(parent1, n_genes)
+
+        # Unfilled positions end up with the genes from parent2
+        offspring = parent2.copy()
+        filled = np.zeros((n, size), dtype=bool)
+
+        index = np.zeros(n, dtype=np.intp)
+        active = np.ones(n, dtype=bool)
+
+        while active.any():
+            r = rows[active]
+            i = index[active]
+
+            # Place the gene from parent1 and move to the position of the matching parent2 gene
+            offspring[r, i] = parent1[r, i]
+            filled[r, i] = True
+            next_index = positions[r, parent2[r, i]]
+
+            # If the gene from parent2 doesn't exist in parent1, move to the next unfilled position
+            missing = np.flatnonzero(next_index == -1)
+            if len(missing):
+                candidates = (i[missing, None] + 1 + np.arange(size)) % size
+                free = ~filled[r[missing, None], candidates]
+                next_index[missing] = np.where(free.any(axis=1),
+                                               candidates[np.arange(len(missing)), np.argmax(free, axis=1)],
+                                               candidates[:, 0])
+
+            # The cycle is complete once it returns to a filled position
+            index[r] = next_index
+            active[r] = ~filled[r, next_index]
+
+        return offspring
+
+    return crossover_batch_children(parents, cycle_child, problem=problem)
+
+
+def pmx_crossover_batch(parents, problem=None):
+    """
+    Batch version of pmx_crossover: all parent pairs are crossed in one vectorized call.
+
+    The crossover segments are drawn pair by pair exactly like pmx_crossover, so the same
+    random state gives the same offspring. The mapping between parents is followed with
+    lookup tables of gene positions instead of nested searches.
+
+    Args:
+        parents (numpy.ndarray): (N, 2, route length) array with the parent pairs.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: (N, 2, route length) array with the two offspring of each pair.
+    """
+
+    n, _, size = parents.shape
+    starts = np.empty(n, dtype=np.intp)
+    ends = np.empty(n, dtype=np.intp)
+    for pair in range(n):
+        starts[pair] = random.randint(0, size - 1)
+        ends[pair] = random.randint(starts[pair] + 1, size)
+
+    def pmx_child(individual1, individual2, n_genes):
+        rows = np.arange(n)
+        positions = first_positions(individual1, n_genes)
+
+        # Copy the segment from individual1
+        filled = (np.arange(size) >= starts[:, None]) & (np.arange(size) < ends[:, None])
+        offspring = np.where(filled, individual1, individual2)
+        present = np.zeros((n, n_genes), dtype=bool)
+        present[np.nonzero(filled)[0], individual1[filled]] = True
+
+        for i in range(size):
+
+            # Elements from individual2's segment that are not in the offspring yet
+            r = rows[(starts <= i) & (i < ends)]
+            element = individual2[r, i]
+            keep = ~present[r, element]
+            r, element = r[keep], element[keep]
+
+            index = positions[r, element]
+            keep = index != -1
+            r, element, index = r[keep], element[keep], index[keep]
+
+            # Follow the mapping until an available position is found
+            for attempt in range(size):
+                busy = filled[r, index]
+                if not busy.any():
+                    break
+                index[busy] = positions[r[busy], individual2[r[busy], index[busy]]]
+                keep = index != -1
+                r, element, index = r[keep], element[keep], index[keep]
+            else:
+                keep = ~filled[r, index]
+                r, element, index = r[keep], element[keep], index[keep]
+
+            offspring[r, index] = element
+            filled[r, index] = True
+            present[r, element] = True
+
+        return offspring
+
+    return crossover_batch_children(parents, pmx_child, inner=False, problem=problem)
+
+
+def ox1_crossover_batch(parents, problem=None):
+    """
+    Batch version of ox1_crossover: all parent pairs are crossed in one vectorized call.
+
+    The cut points are drawn pair by pair exactly like ox1_crossover, so the same random
+    state gives the same offspring.
+
+    Args:
+        parents (numpy.ndarray): (N, 2, route length) array with the parent pairs.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: (N, 2, route length) array with the two offspring of each pair.
+    """
+
+    n, _, size = parents.shape
+    size -= 2
+    cut_points = np.array([sorted(random.sample(range(1, size), 2)) for _ in range(n)], dtype=np.intp).reshape(n, 2)
+
+    def ox1_child(parent1, parent2, n_genes):
+        rows = np.arange(n)[:, None]
+
+        # Copy the selected subtour from parent1, the rest starts as 0 like in ox1_crossover
+        subtour = (np.arange(size) >= cut_points[:, :1]) & (np.arange(size) < cut_points[:, 1:])
+        offspring = np.where(subtour, parent1, 0)
+        in_subtour = np.zeros((n, n_genes), dtype=bool)
+        in_subtour[np.nonzero(subtour)[0], parent1[subtour]] = True
+
+        # Fill in the positions after the subtour, wrapping around, with the remaining genes of parent2 in order
+        remaining = ~in_subtour[rows, parent2]
+        index = (cut_points[:, 1:] + np.cumsum(remaining, axis=1) - 1) % size
+        offspring[np.nonzero(remaining)[0], index[remaining]] = parent2[remaining]
+
+        return offspring
+
+    return crossover_batch_children(parents, ox1_child, problem=problem)
+
+
+def uniform_crossover_batch(parents, problem=None):
+    """
+    Batch version of uniform_crossover: all parent pairs are crossed in one vectorized call.
+
+    The gene choices are drawn pair by pair exactly like uniform_crossover, so the same
+    random state gives the same offspring.
+
+    Args:
+        parents (numpy.ndarray): (N, 2, route length) array with the parent pairs.
+        problem (Problem): The problem the individuals belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: (N, 2, route length) array with the two offspring of each pair.
+    """
+
+    n, _, size = parents.shape
+    from_first = np.array([[random.choice([True, False]) for _ in range(size - 2)] for _ in range(n)], dtype=bool).reshape(n, size - 2)
+
+    def uniform_child(parent1, parent2, n_genes):
+        return np.where(from_first, parent1, parent2)
+
+    return crossover_batch_children(parents, uniform_child, problem=problem)
 
 
+# Batch counterparts used by ga() when the population is stored as a matrix
+BATCH_CROSSOVERS = {cycle_crossover: cycle_crossover_batch,
+                    pmx_crossover: pmx_crossover_batch,
+                    ox1_crossover: ox1_crossover_batch,
+                    uniform_crossover: uniform_crossover_batch}
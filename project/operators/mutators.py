@@ -1,51 +1,94 @@
-from base.individuals import *
+from base.individuals import fix_placeholder, fix_placeholder_batch, post_operations, pre_operations
 import random
+import numpy as np
 
+__all__ = ['edge_delta', 'swap_mutation', 'inversion_mutation', 'scramble_mutation',
+           'insertion_mutation', 'displacement_mutation', 'mutate_batch', 'two_positions',
+           'swap_mutation_batch', 'inversion_mutation_batch', 'scramble_mutation_batch',
+           'insertion_mutation_batch', 'displacement_mutation_batch', 'BATCH_MUTATORS',
+           'DELTA_MUTATORS']
 
-def swap_mutation(individual, p_m):
+
+def edge_delta(individual, mutated_individual, edges):
+    """
+    Builds the edge-delta record of a mutation: the edges of the route it removed and added.
+
+    Args:
+        individual (list): The route before the mutation.
+        mutated_individual (list): The route after the mutation.
+        edges (iterable): Indices k of the edges (k, k + 1) that may have changed.
+
+    Returns:
+        tuple: (removed edges, added edges) as lists of (from, to) areas, or None when the
+               placeholder 0 is in either route and the gain must be calculated in full.
+    """
+
+    if 0 in individual or 0 in mutated_individual:
+        return None
+
+    removed = [(individual[k], individual[k + 1]) for k in edges]
+    added = [(mutated_individual[k], mutated_individual[k + 1]) for k in edges]
+
+    return removed, added
+
+
+def swap_mutation(individual, p_m, problem=None, with_delta=False):
     """
     Applies swap mutation to the individual with a given probability.
 
     Args:
         individual (list): The individual to mutate.
         p_m (float): The probability of mutation.
+        problem (Problem): The problem the individual belongs to. Defaults to the Hollow Knight one.
+        with_delta (bool): If True, also return the edge-delta record of the mutation (see edge_delta).
 
     Returns:
-        list: The mutated individual.
+        list: The mutated individual (and its edge-delta record if with_delta).
     """
     
     # Exclude start and end point from mutation process
     mutated_individual = pre_operations(individual.copy())
+    edges = []
     
     if random.random() < p_m:
         first_index, second_index = random.sample(range(len(mutated_individual)), 2)
+
+        # Only the edges around both genes change
+        edges = sorted({first_index, first_index + 1, second_index, second_index + 1})
         
         # Perform mutation by swapping the current gene with a random gene
         mutated_individual[first_index],mutated_individual[second_index]= mutated_individual[second_index], mutated_individual[first_index]
 
     # Add start and end point (D) to the mutated individual
-    mutated_individual = post_operations(mutated_individual)
+    mutated_individual = post_operations(mutated_individual, problem)
 
     # Fix potential cases for placeholder
-    return fix_placeholder(mutated_individual)
+    mutated_individual = fix_placeholder(mutated_individual, problem)
 
+    if with_delta:
+        return mutated_individual, edge_delta(individual, mutated_individual, edges)
+    return mutated_individual
 
 
 
-def inversion_mutation(individual, p_m):
+
+def inversion_mutation(individual, p_m, problem=None, with_delta=False):
     """
     Applies inversion mutation to the individual with a given probability.
 
     Args:
         individual (list): The individual to mutate.
         p_m (float): The probability of mutation.
+        problem (Problem): The problem the individual belongs to. Defaults to the Hollow Knight one.
+        with_delta (bool): If True, also return the edge-delta record of the mutation (see edge_delta).
 
     Returns:
-        list: The mutated individual.
+        list: The mutated individual (and its edge-delta record if with_delta).
     """
 
     # Exclude start and end point from mutation process
     mutated_individual = pre_operations(individual.copy())
+    edges = []
    
     if random.random() < p_m:
 
@@ -57,30 +100,40 @@ def inversion_mutation(individual, p_m):
                 
         # Perform inversion
         mutated_individual[start_index:end_index] = reversed(mutated_individual[start_index:end_index])
+
+        # The gain matrix is not symmetric, so every edge of the segment changes
+        edges = range(start_index, end_index + 1)
         
     # Add start and end point (D) to the mutated individual
-    mutated_individual = post_operations(mutated_individual)
+    mutated_individual = post_operations(mutated_individual, problem)
 
     # Fix potential cases for placeholder
-    return fix_placeholder(mutated_individual)
+    mutated_individual = fix_placeholder(mutated_individual, problem)
+
+    if with_delta:
+        return mutated_individual, edge_delta(individual, mutated_individual, edges)
+    return mutated_individual
 
 
             
 
-def scramble_mutation(individual, p_m):
+def scramble_mutation(individual, p_m, problem=None, with_delta=False):
     """
     Applies scramble mutation to the individual with a given probability.
 
     Args:
         individual (list): The individual to mutate.
         p_m (float): The probability of mutation.
+        problem (Problem): The problem the individual belongs to. Defaults to the Hollow Knight one.
+        with_delta (bool): If True, also return the edge-delta record of the mutation (see edge_delta).
 
     Returns:
-        list: The mutated individual.
+        list: The mutated individual (and its edge-delta record if with_delta).
     """
 
     # Exclude start and end point from mutation process
     mutated_individual = pre_operations(individual.copy())
+    edges = []
 
     if random.random() < p_m:
 
@@ -96,34 +149,40 @@ def scramble_mutation(individual, p_m):
         random.shuffle(segment)
 
         mutated_individual[start_index:end_index] = segment
+        edges = range(start_index, end_index + 1)
         
     # Add start and end point (D) to the mutated individual
-    mutated_individual = post_operations(mutated_individual)
+    mutated_individual = post_operations(mutated_individual, problem)
 
     # Fix potential cases for placeholder
-    return fix_placeholder(mutated_individual)
+    mutated_individual = fix_placeholder(mutated_individual, problem)
+
+    if with_delta:
+        return mutated_individual, edge_delta(individual, mutated_individual, edges)
+    return mutated_individual
 
 
-def insertion_mutation(individual, p_m):
+def insertion_mutation(individual, p_m, problem=None, with_delta=False):
     """
     Applies insertion mutation to the individual with a given probability.
 
     Args:
         individual (list): The individual to mutate.
         p_m (float): The probability of mutation.
+        problem (Problem): The problem the individual belongs to. Defaults to the Hollow Knight one.
+        with_delta (bool): If True, also return the edge-delta record of the mutation (see edge_delta).
 
     Returns:
-        list: The mutated individual.
+        list: The mutated individual (and its edge-delta record if with_delta).
     """
 
     # Exclude start and end point from mutation process
     mutated_individual = pre_operations(individual.copy())
     
-    # Ensure mutated_individual has at least one gene
-    if len(mutated_individual) <= 1:
-        return mutated_individual
+    edges = []
 
-    if random.random() < p_m:
+    # Only mutate when there is more than one gene to move around
+    if len(mutated_individual) > 1 and random.random() < p_m:
 
         # Select a random gene to remove
         gene_index = random.randint(0, len(mutated_individual) - 1)
@@ -132,28 +191,38 @@ def insertion_mutation(individual, p_m):
         # Reinsert the gene at a random position
         insert_index = random.randint(0, len(mutated_individual)-1)
         mutated_individual.insert(insert_index, gene)
+
+        # Genes between the old and the new position shift by one
+        edges = range(min(gene_index, insert_index), max(gene_index, insert_index) + 2)
         
     # Add start and end point (D) to the mutated individual
-    mutated_individual = post_operations(mutated_individual)
+    mutated_individual = post_operations(mutated_individual, problem)
 
     # Fix potential cases for placeholder
-    return fix_placeholder(mutated_individual)
+    mutated_individual = fix_placeholder(mutated_individual, problem)
+
+    if with_delta:
+        return mutated_individual, edge_delta(individual, mutated_individual, edges)
+    return mutated_individual
 
 
-def displacement_mutation(individual, p_m):
+def displacement_mutation(individual, p_m, problem=None, with_delta=False):
     """
     Perform displacement mutation on an individual with a given mutation probability.
 
     Parameters:
     individual (list): The individual to be mutated.
     p_m (float): The probability of mutation.
+    problem (Problem): The problem the individual belongs to. Defaults to the Hollow Knight one.
+    with_delta (bool): If True, also return the edge-delta record of the mutation (see edge_delta).
 
     Returns:
-    list: The mutated individual
+    list: The mutated individual (and its edge-delta record if with_delta)
     """
     
     # Exclude start and end point from mutation process
     mutated_individual = pre_operations(individual.copy())
+    edges = []
 
     if random.random() < p_m:
 
@@ -176,11 +245,214 @@ def displacement_mutation(individual, p_m):
         # Insert the displaced substring at the new location
         mutated_individual[insert_substring_index:insert_substring_index] = substring_to_displace
 
+        # Genes between the old and the new place of the substring move
+        insert_substring_index = min(insert_substring_index, len(mutated_individual) - len(substring_to_displace))
+        edges = range(min(start_index, insert_substring_index),
+                      max(end_index, insert_substring_index + len(substring_to_displace)) + 1)
+
     # Add start and end point (D) to the mutated individual
-    mutated_individual = post_operations(mutated_individual)
+    mutated_individual = post_operations(mutated_individual, problem)
 
     # Fix potential cases for placeholder
-    return fix_placeholder(mutated_individual)
+    mutated_individual = fix_placeholder(mutated_individual, problem)
+
+    if with_delta:
+        return mutated_individual, edge_delta(individual, mutated_individual, edges)
+    return mutated_individual
+
+
+
+def mutate_batch(routes, p_m, make_keys, problem=None):
+    """
+    Mutate a matrix of routes in place: a Bernoulli mask with probability p_m picks the rows
+    that mutate, and their genes (Dirtmouth excluded) are reordered by sorting the keys
+    given by make_keys.
+
+    Every mutation is written as sort keys over the gene positions: a position keeps its gene
+    when its key is its own index, and a gene moves to position k when its key sorts k-th.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row. It is mutated in place.
+        p_m (float): The probability of mutation of each row.
+        make_keys (function): Takes the number of mutating rows and the number of genes and
+                              returns the (rows, genes) sort keys of the mutation.
+        problem (Problem): The problem giving the skip rule. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: The same matrix, mutated.
+    """
+
+    size = routes.shape[1] - 2
+    mutated = np.flatnonzero(np.random.random(len(routes)) < p_m)
+
+    if len(mutated) and size > 1:
+        keys = make_keys(len(mutated), size)
+        order = np.argsort(keys, axis=1, kind='stable')
+        genes = routes[mutated, 1:-1]
+        routes[mutated, 1:-1] = np.take_along_axis(genes, order, axis=1)
+
+    # Fix potential cases for placeholder
+    return fix_placeholder_batch(routes, problem)
+
+
+def two_positions(n, size):
+    """
+    Draw two different gene positions for each of n routes, like random.sample(range(size), 2).
+
+    Args:
+        n (int): Number of routes.
+        size (int): Number of genes in each route.
+
+    Returns:
+        tuple: Two arrays with the first and second positions.
+    """
+
+    first_index = np.random.randint(0, size, n)
+    second_index = np.random.randint(0, size - 1, n)
+    second_index += second_index >= first_index
+
+    return first_index, second_index
+
+
+def swap_mutation_batch(routes, p_m, problem=None):
+    """
+    Batch version of swap_mutation, applied in place to every row of a matrix of routes.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row.
+        p_m (float): The probability of mutation of each row.
+        problem (Problem): The problem the routes belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: The same matrix, mutated.
+    """
+
+    def swap_keys(n, size):
+        rows = np.arange(n)
+        first_index, second_index = two_positions(n, size)
+
+        # Swap the keys of the two genes
+        keys = np.tile(np.arange(size), (n, 1))
+        keys[rows, first_index] = second_index
+        keys[rows, second_index] = first_index
+        return keys
+
+    return mutate_batch(routes, p_m, swap_keys, problem)
+
+
+def inversion_mutation_batch(routes, p_m, problem=None):
+    """
+    Batch version of inversion_mutation, applied in place to every row of a matrix of routes.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row.
+        p_m (float): The probability of mutation of each row.
+        problem (Problem): The problem the routes belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: The same matrix, mutated.
+    """
+
+    def inversion_keys(n, size):
+        start_index, end_index = np.sort(two_positions(n, size), axis=0)[:, :, None]
+        positions = np.arange(size)
+
+        # Genes inside the segment are sorted backwards
+        segment = (positions >= start_index) & (positions < end_index)
+        return np.where(segment, start_index + end_index - 1 - positions, positions)
+
+    return mutate_batch(routes, p_m, inversion_keys, problem)
+
+
+def scramble_mutation_batch(routes, p_m, problem=None):
+    """
+    Batch version of scramble_mutation, applied in place to every row of a matrix of routes.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row.
+        p_m (float): The probability of mutation of each row.
+        problem (Problem): The problem the routes belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: The same matrix, mutated.
+    """
+
+    def scramble_keys(n, size):
+        start_index, end_index = np.sort(two_positions(n, size), axis=0)[:, :, None]
+        positions = np.arange(size)
+
+        # Genes inside the segment get random keys within the segment
+        segment = (positions >= start_index) & (positions < end_index)
+        random_keys = start_index + np.random.random((n, size)) * (end_index - start_index)
+        return np.where(segment, random_keys, positions)
+
+    return mutate_batch(routes, p_m, scramble_keys, problem)
+
+
+def insertion_mutation_batch(routes, p_m, problem=None):
+    """
+    Batch version of insertion_mutation, applied in place to every row of a matrix of routes.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row.
+        p_m (float): The probability of mutation of each row.
+        problem (Problem): The problem the routes belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: The same matrix, mutated.
+    """
+
+    def insertion_keys(n, size):
+        rows = np.arange(n)
+        gene_index = np.random.randint(0, size, n)
+        insert_index = np.random.randint(0, size - 1, n)
+
+        # The removed gene is sorted right before or after the gene at its new position
+        keys = np.tile(np.arange(size, dtype=np.float64), (n, 1))
+        keys[rows, gene_index] = np.where(insert_index >= gene_index, insert_index + 0.5, insert_index - 0.5)
+        return keys
+
+    return mutate_batch(routes, p_m, insertion_keys, problem)
+
+
+def displacement_mutation_batch(routes, p_m, problem=None):
+    """
+    Batch version of displacement_mutation, applied in place to every row of a matrix of routes.
+
+    Args:
+        routes (numpy.ndarray): Matrix of routes, one per row.
+        p_m (float): The probability of mutation of each row.
+        problem (Problem): The problem the routes belong to. Defaults to the Hollow Knight one.
+
+    Returns:
+        numpy.ndarray: The same matrix, mutated.
+    """
+
+    def displacement_keys(n, size):
+        positions = np.arange(size)
+        start_index = np.random.randint(0, size, n)[:, None]
+        end_index = start_index + np.random.randint(0, size - start_index + 1)
+        insert_substring_index = np.random.randint(0, size + 1, n)[:, None]
+
+        # Genes left out of the substring keep their order
+        substring = (positions >= start_index) & (positions < end_index)
+        keys = np.cumsum(~substring, axis=1) - 1.0
+
+        # The substring is sorted, in order, right before the insertion point
+        # (past the end of the remaining genes it goes at the end, like a list slice)
+        insert_substring_index = np.minimum(insert_substring_index, size - (end_index - start_index))
+        offset = (positions - start_index + 1) / (end_index - start_index + 1)
+        return np.where(substring, insert_substring_index - 1 + offset, keys)
+
+    return mutate_batch(routes, p_m, displacement_keys, problem)
 
 
+# Batch counterparts used by ga() when the population is stored as a matrix
+BATCH_MUTATORS = {swap_mutation: swap_mutation_batch,
+                  inversion_mutation: inversion_mutation_batch,
+                  scramble_mutation: scramble_mutation_batch,
+                  insertion_mutation: insertion_mutation_batch,
+                  displacement_mutation: displacement_mutation_batch}
 
+# Mutators able to return the edge-delta record of their mutation (with_delta=True)
+DELTA_MUTATORS = {swap_mutation, inversion_mutation, scramble_mutation, insertion_mutation, displacement_mutation}
@@ -1,6 +1,60 @@
 import random
 import numpy as np
 
+__all__ = ['roulette_sampler', 'cumulative_sampler', 'roulette_selection_max', 'ranking_sampler',
+           'ranking_selection_max', 'tournament_sampler', 'tournament_selection_max',
+           'exponential_rank_sampler', 'exponential_rank_selection', 'linear_rank_sampler',
+           'linear_rank_selection', 'SAMPLERS', 'selection_function']
+
+def roulette_sampler(fitnesses):
+    """Build a roulette wheel sampler over the fitnesses, for maximization.
+
+    The cumulative table of selection probabilities is built once, so each draw is a binary search.
+
+    Args:
+    fitnesses (list): List of fitness values corresponding to each individual in the population.
+
+    Returns:
+    callable: draw(k=None), returning the index of one selected individual (drawn from the random
+              module, exactly like random.choices) or, given k, an array with k indices (drawn from
+              numpy.random).
+    """
+
+    sum_of_fitnesses = sum(fitnesses)
+
+    probabilities = np.asarray(fitnesses, dtype=np.float64) / sum_of_fitnesses
+
+    return cumulative_sampler(probabilities)
+
+
+def cumulative_sampler(weights):
+    """Build a sampler drawing indices with the given weights from their cumulative sums.
+
+    Args:
+    weights (numpy.ndarray): Selection weight of each individual.
+
+    Returns:
+    callable: draw(k=None), as described in roulette_sampler.
+    """
+
+    # Same cumulative weights and bisection as random.choices, so single draws match it
+    cum_weights = np.cumsum(weights)
+    total = cum_weights[-1] + 0.0
+    if total <= 0.0:
+        raise ValueError('Total of weights must be greater than zero')
+    if not np.isfinite(total):
+        raise ValueError('Total of weights must be finite')
+
+    last = len(cum_weights) - 1
+
+    def draw(k=None):
+        if k is None:
+            return min(int(np.searchsorted(cum_weights, random.random() * total, side='right')), last)
+        return np.minimum(np.searchsorted(cum_weights, np.random.random(k) * total, side='right'), last)
+
+    return draw
+
+
 def roulette_selection_max(pop, fitnesses):
 
     """Perform roulette wheel selection to choose an individual from the population based on fitness for maximization.
@@ -13,11 +67,32 @@ def roulette_selection_max(pop, fitnesses):
     object: Selected individual based on the roulette wheel selection for maximization.
     """
 
-    sum_of_fitnesses = sum(fitnesses)
+    return pop[roulette_sampler(fitnesses)()]
 
-    probabilities = [fitness / sum_of_fitnesses for fitness in fitnesses]
 
-    return random.choices(pop, weights=probabilities)[0]
+def ranking_sampler(fitness):
+    """
+    Build a ranking selection sampler over the fitnesses, for maximization.
+
+    The population is ranked once, so each draw is a binary search.
+
+    Args:
+        fitness (list): List of fitness values corresponding to each individual in the population.
+
+    Returns:
+        callable: draw(k=None), as described in roulette_sampler.
+    """
+
+    # Sort the population by fitness (ascending order)
+    order = np.argsort(fitness, kind='stable')
+
+    # Get the rank indices (1 for worst, 'N' for best) and perform roulette wheel selection on them
+    draw_rank = roulette_sampler(list(range(1, len(order) + 1)))
+
+    def draw(k=None):
+        return order[draw_rank(k)]
+
+    return draw
 
 
 def ranking_selection_max(population, fitness):
@@ -31,18 +106,47 @@ def ranking_selection_max(population, fitness):
     Returns:
         object: Selected individual based on the ranking selection for maximization.
     """
-    
-    # Sort the population by fitness (ascending order)
-    sorted_pairs = sorted(zip(population, fitness), key=lambda x: x[1], reverse=False)
 
-    # Sort the population
-    sorted_population, sorted_fitnesses = zip(*sorted_pairs)
+    return population[ranking_sampler(fitness)()]
+
+
+def tournament_sampler(fitnesses):
+    """
+    Build a tournament selection sampler over the fitnesses, for maximization.
+
+    Args:
+        fitnesses (list): List of fitness values corresponding to each individual in the population.
+
+    Returns:
+        callable: draw(k=None), as described in roulette_sampler.
+    """
+    # Define the size of the tournament pool
+    tournament_size = 3
+
+    fitnesses = np.asarray(fitnesses)
+    n = len(fitnesses)
 
-    # Get the rank indices (1 for worst, 'N' for best)
-    rank_fitnesses = list(range(1, len(sorted_population) + 1))
+    def draw(k=None):
+        if k is None:
+            # Randomly select indices for the tournament pool
+            indices = random.sample(range(n), tournament_size)
+
+            # Identify the index of the individual with the maximum fitness in the tournament pool
+            return max(indices, key=lambda idx: fitnesses[idx])
+
+        # Randomly select three different indices for each of the k tournaments
+        first = np.random.randint(0, n, k)
+        second = np.random.randint(0, n - 1, k)
+        second += second >= first
+        third = np.random.randint(0, n - 2, k)
+        third += third >= np.minimum(first, second)
+        third += third >= np.maximum(first, second)
+
+        pools = np.stack([first, second, third], axis=1)
+        return pools[np.arange(k), np.argmax(fitnesses[pools], axis=1)]
+
+    return draw
 
-    # Perform roulette wheel selection based on the rank indices
-    return roulette_selection_max(sorted_population, rank_fitnesses)
 
 def tournament_selection_max(pop, fitnesses):
     """
@@ -55,18 +159,31 @@ def tournament_selection_max(pop, fitnesses):
     Returns:
         object: Selected individual based on the tournament selection for maximization.
     """
-    # Define the size of the tournament pool
-    tournament_size = 3  
 
-    # Randomly select indices for the tournament pool
-    indices = random.sample(range(len(pop)), tournament_size)
+    return pop[tournament_sampler(fitnesses)()]
 
-    # Identify the index of the individual with the maximum fitness in the tournament pool
-    max_index = max(indices, key=lambda idx: fitnesses[idx])
 
-    # Return the individual corresponding to the maximum fitness
-    return pop[max_index]
+def exponential_rank_sampler(fitness, rate=0.1):
+    """
+    Build an exponential rank selection sampler over the fitnesses.
 
+    Args:
+        fitness(list): List of fitness values corresponding to each individual in the population.
+        rate(float): Exponential rate parameter. 
+
+    Return:
+        callable: draw(k=None), as described in roulette_sampler.
+    """
+
+    # Get the rank indices
+    rank = np.arange(1, len(fitness) + 1)
+
+    # Calculate selection probabilities 
+    probability = np.exp(-rate * rank)
+    probability /= probability.sum() # Normalize probabilities
+
+    # The weights are applied to the population as given, like random.choices(population, ...) did
+    return cumulative_sampler(probability)
 
 
 def exponential_rank_selection(population, fitness, rate=0.1):
@@ -82,20 +199,33 @@ def exponential_rank_selection(population, fitness, rate=0.1):
         object: Selected individual based on the exponantial rank selection.
     """
 
+    return population[exponential_rank_sampler(fitness, rate)()]
+
+
+def linear_rank_sampler(fitness):
+    """
+    Build a linear rank selection sampler over the fitnesses.
+
+    Args:
+        fitness (list): List of fitness values corresponding to each individual in the population.
+
+    Returns:
+        callable: draw(k=None), as described in roulette_sampler.
+    """
+
     # Sort the population by fitness (descending order)
-    sorted_pairs = sorted(zip(population, fitness), key=lambda x: x[1], reverse=True)
+    order = np.argsort(-np.asarray(fitness), kind='stable')
 
-    # Sort the population
-    sorted_population, sorted_fitnesses = zip(*sorted_pairs)
+    # Calculate selection probabilities linearly
+    num_individuals = len(order)
+    probability = (num_individuals - np.arange(num_individuals)) / (num_individuals * (num_individuals + 1) / 2)
 
-    # Get the rank indices
-    rank = np.arange(1, len(sorted_population) + 1)
+    draw_rank = cumulative_sampler(probability)
 
-    # Calculate selection probabilities 
-    probability = np.exp(-rate * rank)
-    probability /= probability.sum() # Normalize probabilities
+    def draw(k=None):
+        return order[draw_rank(k)]
 
-    return random.choices(population, weights=probability)[0]
+    return draw
 
 
 def linear_rank_selection(population, fitness):
@@ -109,13 +239,35 @@ def linear_rank_selection(population, fitness):
     Returns:
         object: Selected individual based on linear rank selection.
     """
-    
-    # Sort the population by fitness (descending order)
-    sorted_pairs = sorted(zip(population, fitness), key=lambda x: x[1], reverse=True)
-    sorted_population, _ = zip(*sorted_pairs)
 
-    # Calculate selection probabilities linearly
-    num_individuals = len(sorted_population)
-    probability = [(num_individuals - i) / (num_individuals * (num_individuals + 1) / 2) for i in range(num_individuals)]
+    return population[linear_rank_sampler(fitness)()]
+
+
+# Samplers built once per generation by ga() instead of calling the selector for every parent
+SAMPLERS = {roulette_selection_max: roulette_sampler,
+            ranking_selection_max: ranking_sampler,
+            tournament_selection_max: tournament_sampler,
+            exponential_rank_selection: exponential_rank_sampler,
+            linear_rank_selection: linear_rank_sampler}
+
+
+def selection_function(selector, population, fitnesses):
+    """
+    Prepare the selection of parents from a population for one generation.
+
+    Selectors listed in SAMPLERS build their sampler here, once; other selectors are called as usual.
+
+    Args:
+        selector (function): Selection function, called as selector(population, fitnesses).
+        population (list): List of individuals.
+        fitnesses (list): List of fitness values corresponding to each individual in the population.
+
+    Returns:
+        callable: Function without arguments returning one selected individual per call.
+    """
+
+    if selector in SAMPLERS:
+        draw = SAMPLERS[selector](fitnesses)
+        return lambda: population[draw()]
 
-    return random.choices(sorted_population, weights=probability)[0]
\ No newline at end of file
+    return lambda: selector(population, fitnesses)
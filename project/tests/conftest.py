@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of the project are imported from its directory, as main.py and gridsearch.py do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
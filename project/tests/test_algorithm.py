@@ -0,0 +1,103 @@
+import random
+import pytest
+from base.data import generate_geo_matrix
+from base.individuals import calculate_route_gain, no_constraint
+from base.problem import AdjacencyBan, PositionBound, Problem, SkipRule
+from base.population import create_population, create_population_array, calculate_population_gain
+from operators.selectors import roulette_selection_max
+from operators.crossovers import cycle_crossover
+from operators.mutators import displacement_mutation
+from algorithm.algorithm import brute_force, ga, held_karp, solve, steady_state_ga
+from algorithm.utils import get_elite_max
+from algorithm.log import read_generation_log
+
+GA_PARAMS = {'initializer': create_population,
+             'evaluator': calculate_population_gain,
+             'selector': roulette_selection_max,
+             'crossover': cycle_crossover,
+             'mutator': displacement_mutation,
+             'pop_size': 30,
+             'n_gens': 5,
+             'p_xo': 0.8,
+             'p_m': 0.1,
+             'elite_func': get_elite_max,
+             'fit_plot': False}
+
+
+@pytest.fixture
+def gain_matrix_20():
+    random.seed(3)
+    return generate_geo_matrix(20)
+
+
+def assert_visits_all_areas(route, n_areas):
+    # KS (7) may be skipped, replaced by the placeholder 0
+    areas = [7 if area == 0 else area for area in route[1:-1]]
+    assert route[0] == route[-1] == 1
+    assert sorted(areas) == list(range(2, n_areas + 1))
+
+
+def test_ga_plain_matrix_of_20_areas_visits_all_areas(gain_matrix_20):
+    best_ind, best_fit = ga(gain_matrix=gain_matrix_20, **GA_PARAMS)
+    assert_visits_all_areas(best_ind, 20)
+
+
+def test_solve_plain_matrix_of_20_areas_visits_all_areas(gain_matrix_20):
+    best_ind, best_fit = solve(gain_matrix_20, **GA_PARAMS)
+    assert_visits_all_areas(best_ind, 20)
+
+
+def test_ga_logs_to_a_path_object(tmp_path):
+    random.seed(3)
+    log_path = tmp_path / 'log.csv'
+    ga(gain_matrix=generate_geo_matrix(10), log_path=log_path, **GA_PARAMS)
+    rows = read_generation_log(log_path)
+    assert [gen for seed, gen, fit, elite in rows] == list(range(GA_PARAMS['n_gens']))
+
+
+@pytest.mark.parametrize('initializer', [create_population, create_population_array])
+def test_ga_returns_a_python_float(initializer):
+    random.seed(3)
+    best_ind, best_fit = ga(gain_matrix=generate_geo_matrix(10), **dict(GA_PARAMS, initializer=initializer))
+    assert type(best_fit) is float
+    assert all(type(area) is int for area in best_ind)
+
+
+def small_problem(seed, n_areas=9):
+    random.seed(seed)
+    gain_matrix = generate_geo_matrix(n_areas)
+    # Going from QS (4) straight to DV (9) pays off on even seeds, so their best routes skip KS (7)
+    if seed % 2 == 0:
+        gain_matrix[3][8] = 5000.0
+    return Problem(gain_matrix, constraints=[AdjacencyBan(first=5, second=6), PositionBound(area=8, lower=(n_areas + 1) // 2),
+                                             SkipRule(skipped=7, before=4, after=9)])
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_held_karp_matches_brute_force(seed):
+    problem = small_problem(seed)
+    best_ind, best_fit = held_karp(problem)
+    brute_ind, brute_fit, report = brute_force(problem)
+
+    assert best_fit == pytest.approx(brute_fit)
+    assert no_constraint(best_ind, problem)
+    assert calculate_route_gain(best_ind, problem) == pytest.approx(best_fit)
+    assert (0 in best_ind) == (0 in brute_ind)
+    if seed % 2 == 0:
+        assert 0 in best_ind
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_steady_state_ga_marks_the_skip_on_the_best_route(n_workers):
+    problem = small_problem(0)
+    params = {key: value for key, value in GA_PARAMS.items() if key not in ('elite_func', 'fit_plot')}
+
+    best_ind, best_fit = steady_state_ga(gain_matrix=problem, **params, n_workers=n_workers, seed=3)
+
+    # Evaluating the route again must not mark it any further
+    route = list(best_ind)
+    assert calculate_route_gain(route, problem) == pytest.approx(best_fit)
+    assert route == best_ind
+    # Runs with several workers are not reproducible, a single one finds a route skipping KS
+    if n_workers == 1:
+        assert 0 in best_ind
@@ -0,0 +1,52 @@
+import random
+import numpy as np
+from base.data import generate_geo_matrix
+from base.population import create_population, calculate_population_gain
+from operators.selectors import tournament_selection_max
+from operators.crossovers import ox1_crossover
+from operators.mutators import swap_mutation
+from algorithm.algorithm import ga, held_karp
+from algorithm.utils import get_elite_max
+from gridsearch import grid_search, matrix_digest, task_key
+
+
+def params_dict():
+    random.seed(5)
+    return {'initializer': [create_population],
+            'gain_matrix': [generate_geo_matrix(10)],
+            'evaluator': [calculate_population_gain],
+            'selector': [tournament_selection_max],
+            'crossover': [ox1_crossover],
+            'mutator': [swap_mutation],
+            'pop_size': [20],
+            'n_gens': [3, 5],
+            'p_xo': [0.8],
+            'p_m': [0.1],
+            'elite_func': [get_elite_max],
+            'fit_plot': [False],
+            'return_report': [True]}
+
+
+def test_task_key_uses_the_matrix_digest():
+    params = {key: values[0] for key, values in params_dict().items()}
+    digests = {id(params['gain_matrix']): matrix_digest(params['gain_matrix'])}
+    assert task_key(params, 0, digests) == task_key(params, 0)
+    assert task_key(params, 0, digests) != task_key({**params, 'gain_matrix': generate_geo_matrix(10)}, 0)
+
+
+def test_resumed_grid_search_returns_the_same_results(tmp_path):
+    store_path = str(tmp_path / 'runs.sqlite')
+    fresh = grid_search(ga, 2, params_dict(), n_processes=1, store_path=store_path)
+    resumed = grid_search(ga, 2, params_dict(), n_processes=1, store_path=store_path)
+
+    history = resumed['best_fit']['runs'][0]['report']['history']
+    assert all(isinstance(values, np.ndarray) for values in history.values())
+    np.testing.assert_equal(resumed, fresh)
+
+
+def test_grid_search_runs_deterministic_solvers_once():
+    gain_matrix = params_dict()['gain_matrix'][0]
+    results = grid_search(held_karp, 2, {'gain_matrix': [gain_matrix]}, n_processes=1)['best_fit']
+
+    assert results['avg_fit'] == held_karp(gain_matrix)[1]
+    assert [run['seed'] for run in results['runs']] == [None, None]
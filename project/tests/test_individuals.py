@@ -0,0 +1,55 @@
+import random
+import numpy as np
+import pytest
+from base.data import generate_geo_matrix
+from base.individuals import no_constraint, no_constraint_batch, repair_constraints_batch
+from base.problem import AdjacencyBan, PositionBound, Problem, SkipRule, default_problem, hollow_knight_constraints
+
+
+def problems():
+    random.seed(9)
+    return [None,
+            Problem(generate_geo_matrix(20), constraints=hollow_knight_constraints(20)),
+            Problem(generate_geo_matrix(12), constraints=[AdjacencyBan(first=2, second=3), AdjacencyBan(first=10, second=11),
+                                                          PositionBound(area=5, lower=2, upper=6),
+                                                          SkipRule(skipped=7, before=4, after=9)])]
+
+
+PROBLEM_IDS = ['10 areas', '20 areas', '12 areas, other constraints']
+
+
+def random_routes(problem, n_routes=500):
+    """Routes drawn without the constraints, some with a repeated area or the placeholder 0."""
+    problem = problem or default_problem()
+    random.seed(10)
+    routes = []
+    for i in range(n_routes):
+        areas = random.sample(problem.areas, len(problem.areas))
+        if i % 4 == 1:
+            areas[random.randrange(len(areas))] = random.choice(problem.areas)
+        if i % 5 == 2 and problem.skip_rule.skipped in areas:
+            areas[areas.index(problem.skip_rule.skipped)] = 0
+        routes.append([problem.depot] + areas + [problem.depot])
+    return np.array(routes, dtype=problem.dtype)
+
+
+@pytest.mark.parametrize('problem', problems(), ids=PROBLEM_IDS)
+def test_no_constraint_batch_matches_no_constraint(problem):
+    routes = random_routes(problem)
+    expected = [no_constraint(route, problem) for route in routes.tolist()]
+
+    assert no_constraint_batch(routes, problem).tolist() == expected
+    assert any(expected) and not all(expected)
+
+
+@pytest.mark.parametrize('problem', problems(), ids=PROBLEM_IDS)
+def test_repaired_routes_satisfy_the_constraints(problem):
+    routes = random_routes(problem)
+    valid = no_constraint_batch(routes, problem)
+    original = routes.copy()
+
+    repair_constraints_batch(routes, problem)
+
+    assert all(no_constraint(route, problem) for route in routes.tolist())
+    # Valid routes are left as they are
+    assert (routes[valid] == original[valid]).all()
@@ -0,0 +1,80 @@
+import random
+import numpy as np
+import pytest
+from base.data import generate_geo_matrix
+from base.individuals import calculate_route_gain, delta_route_gain, no_constraint
+from base.problem import Problem, hollow_knight_constraints
+from base.population import create_population
+from operators.crossovers import BATCH_CROSSOVERS, pmx_crossover
+from operators.mutators import DELTA_MUTATORS, insertion_mutation
+
+
+def problems():
+    random.seed(4)
+    return [None, Problem(generate_geo_matrix(20), constraints=hollow_knight_constraints(20))]
+
+
+def parent_pairs(problem, n_pairs=40):
+    random.seed(5)
+    population = create_population(2 * n_pairs, problem)
+    # Routes skipping KS (7) carry the placeholder 0, as they do once evaluated
+    for route in population[::3]:
+        route[route.index(7)] = 0
+    return list(zip(population[::2], population[1::2]))
+
+
+@pytest.mark.parametrize('problem', problems(), ids=['10 areas', '20 areas'])
+@pytest.mark.parametrize('crossover', list(BATCH_CROSSOVERS), ids=lambda crossover: crossover.__name__)
+def test_batch_crossover_matches_scalar_crossover(crossover, problem):
+    pairs = parent_pairs(problem)
+
+    # The batch crossovers draw their cut points and choices pair by pair, like the scalar ones
+    random.seed(6)
+    expected = [list(crossover(parent1, parent2, problem=problem)) for parent1, parent2 in pairs]
+    random.seed(6)
+    children = BATCH_CROSSOVERS[crossover](np.array(pairs), problem=problem)
+
+    assert children.tolist() == expected
+
+
+def test_pmx_crossover_keeps_a_single_depot_at_both_ends():
+    parent1 = [1, 6, 3, 10, 5, 4, 9, 2, 8, 7, 1]
+    parent2 = [1, 7, 9, 4, 10, 5, 3, 6, 2, 8, 1]
+
+    random.seed(9)
+    children = pmx_crossover(parent1, parent2)
+
+    assert children == ([1, 6, 9, 4, 10, 5, 3, 2, 8, 7, 1], [1, 7, 3, 10, 5, 4, 9, 6, 2, 8, 1])
+    assert all(no_constraint(child) for child in children)
+
+
+def gain_matrices():
+    random.seed(4)
+    return [generate_geo_matrix(10), Problem(generate_geo_matrix(20), constraints=hollow_knight_constraints(20))]
+
+
+@pytest.mark.parametrize('gain_matrix', gain_matrices(), ids=['10 areas', '20 areas'])
+@pytest.mark.parametrize('mutator', sorted(DELTA_MUTATORS, key=lambda mutator: mutator.__name__),
+                         ids=lambda mutator: mutator.__name__)
+def test_delta_gain_matches_full_evaluation(mutator, gain_matrix):
+    problem = gain_matrix if isinstance(gain_matrix, Problem) else None
+    random.seed(8)
+    population = create_population(300, problem)
+
+    for i, parent in enumerate(population):
+        # Put DV (9) right after QS (4) in every other route, so some parents and children skip KS
+        if i % 2:
+            parent.remove(9)
+            parent.insert(parent.index(4) + 1, 9)
+        # Evaluating the parent marks it with the placeholder 0 when skipping KS pays off
+        parent_gain = calculate_route_gain(parent, gain_matrix)
+
+        child, delta = mutator(parent, 1.0, problem=problem, with_delta=True)
+        gain = delta_route_gain(parent_gain, delta, list(child), gain_matrix)
+
+        assert gain == pytest.approx(calculate_route_gain(list(child), gain_matrix))
+
+
+def test_insertion_mutation_keeps_the_depot_on_single_area_routes():
+    assert insertion_mutation([1, 5, 1], 1.0) == [1, 5, 1]
+    assert insertion_mutation([1, 5, 1], 1.0, with_delta=True) == ([1, 5, 1], ([], []))
@@ -0,0 +1,52 @@
+import random
+from copy import deepcopy
+import numpy as np
+import pytest
+from base.data import generate_geo_matrix
+from base.individuals import calculate_route_gain
+from base.problem import Problem, hollow_knight_constraints
+from base.population import calculate_population_gain, calculate_population_gain_batch, create_population
+
+
+def instances():
+    random.seed(7)
+    problem = Problem(generate_geo_matrix(20), constraints=hollow_knight_constraints(20))
+    return [(generate_geo_matrix(10), None), (problem, problem)]
+
+
+def evaluated_routes(problem, n_routes=300):
+    random.seed(8)
+    routes = create_population(n_routes, problem)
+    for i, route in enumerate(routes):
+        # Half the routes have DV (9) right after QS (4), where KS (7) may be skipped
+        if i % 2:
+            route.remove(9)
+            route.insert(route.index(4) + 1, 9)
+        # and some of them are already marked with the placeholder 0
+        if i % 6 == 1:
+            route[route.index(7)] = 0
+    return routes
+
+
+@pytest.mark.parametrize('gain_matrix, problem', instances(), ids=['10 areas', '20 areas'])
+@pytest.mark.parametrize('as_array', [False, True], ids=['list', 'array'])
+def test_batch_evaluator_matches_calculate_route_gain(gain_matrix, problem, as_array):
+    routes = evaluated_routes(problem)
+    expected_routes = deepcopy(routes)
+    expected = [calculate_route_gain(route, gain_matrix) for route in expected_routes]
+
+    population = np.array(routes) if as_array else routes
+    gains = calculate_population_gain_batch(population, gain_matrix)
+
+    assert gains.tolist() == expected
+    # Both mark the routes skipping KS with the placeholder 0
+    assert (population.tolist() if as_array else population) == expected_routes
+    assert any(0 in route and 0 not in original for route, original in zip(expected_routes, evaluated_routes(problem)))
+
+
+@pytest.mark.parametrize('gain_matrix, problem', instances(), ids=['10 areas', '20 areas'])
+def test_calculate_population_gain_uses_the_batch_evaluator_for_arrays(gain_matrix, problem):
+    routes = evaluated_routes(problem)
+    expected = calculate_population_gain(deepcopy(routes), gain_matrix)
+
+    assert calculate_population_gain(np.array(routes), gain_matrix).tolist() == expected